@@ -3,6 +3,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from alembic import context
 from app.config import settings
+from app.database import get_sync_database_url
 from app.models import Base
 
 # this is the Alembic Config object, which provides
@@ -25,7 +26,8 @@ target_metadata = Base.metadata
 
 
 def get_url():
-    return settings.database_url
+    # Миграции выполняются синхронным драйвером
+    return get_sync_database_url(settings.database_url)
 
 
 def run_migrations_offline() -> None:
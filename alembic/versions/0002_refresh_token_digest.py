@@ -0,0 +1,79 @@
+"""Хранение refresh токенов в виде SHA-256 digest и составной индекс
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:05:00.000000
+
+"""
+import hashlib
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# Размер пачки при пересчете существующих токенов
+BATCH_SIZE = 1000
+
+refresh_tokens = sa.table(
+    'refresh_tokens',
+    sa.column('id', sa.Integer),
+    sa.column('token', sa.Text),
+    sa.column('token_hash', sa.String(64)),
+)
+
+
+def upgrade() -> None:
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+
+    # Пересчитываем digest существующих токенов пачками по первичному ключу
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(refresh_tokens.c.id, refresh_tokens.c.token)
+            .where(refresh_tokens.c.id > last_id)
+            .order_by(refresh_tokens.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            refresh_tokens.update()
+            .where(refresh_tokens.c.id == sa.bindparam('row_id'))
+            .values(token_hash=sa.bindparam('digest')),
+            [
+                {'row_id': row.id, 'digest': hashlib.sha256(row.token.encode()).hexdigest()}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.drop_column('token')
+        batch_op.create_index(batch_op.f('ix_refresh_tokens_token_hash'), ['token_hash'], unique=True)
+        batch_op.create_index(
+            'ix_refresh_tokens_user_id_is_revoked_expires_at',
+            ['user_id', 'is_revoked', 'expires_at'],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    # Исходные токены из digest не восстановить: после отката все сессии недействительны
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_index('ix_refresh_tokens_user_id_is_revoked_expires_at')
+        batch_op.drop_index(batch_op.f('ix_refresh_tokens_token_hash'))
+        batch_op.add_column(sa.Column('token', sa.Text(), nullable=True))
+
+    op.execute(refresh_tokens.update().values(token=refresh_tokens.c.token_hash))
+
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token', existing_type=sa.Text(), nullable=False)
+        batch_op.create_unique_constraint('refresh_tokens_token_key', ['token'])
+        batch_op.drop_column('token_hash')
@@ -0,0 +1,29 @@
+"""Время последнего использования и устройство refresh сессий
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('refresh_tokens', sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('refresh_tokens', sa.Column('user_agent', sa.String(length=255), nullable=True))
+    op.add_column('refresh_tokens', sa.Column('ip_address', sa.String(length=45), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_column('ip_address')
+        batch_op.drop_column('user_agent')
+        batch_op.drop_column('last_used_at')
@@ -1,51 +1,54 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.auth import (
     authenticate_user, create_access_token, create_refresh_token,
-    verify_refresh_token, revoke_refresh_token, get_current_active_user
+    verify_refresh_token, rotate_refresh_token, revoke_refresh_token, revoke_all_refresh_tokens,
+    get_current_active_user, get_current_superuser, introspect_tokens
 )
-from app.crud import create_user, get_user_by_email, get_user_by_username
+from app.crud import UserConflictError, create_user
+from app.ratelimit import enforce_login_rate_limit, login_rate_limiter
 from app.schemas import (
-    UserCreate, User, Token, LoginRequest, RefreshTokenRequest
+    UserCreate, User, Token, LoginRequest, RefreshTokenRequest,
+    IntrospectionRequest, IntrospectionResponse, Session
 )
+from app.serializers import (
+    etag_matches, not_modified_response, token_response, user_etag, user_response
+)
+from app.sessions import device_metadata, list_sessions, revoke_session
 from app.config import settings
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Регистрация нового пользователя"""
-    # Проверяем, что email не занят
-    if get_user_by_email(db, email=user.email):
+    try:
+        return await create_user(db=db, user=user)
+    except UserConflictError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=str(e)
         )
-    
-    # Проверяем, что username не занят
-    if get_user_by_username(db, username=user.username):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
-        )
-    
-    return create_user(db=db, user=user)
 
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
     """Вход в систему"""
-    user = authenticate_user(db, login_data.username, login_data.password)
+    # Лимит попыток проверяется до bcrypt
+    await enforce_login_rate_limit(request, login_data.username)
+    user = await authenticate_user(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await login_rate_limiter.reset(login_data.username)
     
     if not user.is_active:
         raise HTTPException(
@@ -60,7 +63,7 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     )
     
     # Создаем refresh токен
-    refresh_token = create_refresh_token(user.id, db)
+    refresh_token = await create_refresh_token(user.id, db, **device_metadata(request))
     
     return {
         "access_token": access_token,
@@ -71,15 +74,21 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login/form", response_model=Token)
-def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_form(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
     """Вход в систему через форму (OAuth2 совместимый)"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    await enforce_login_rate_limit(request, form_data.username)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await login_rate_limiter.reset(form_data.username)
     
     if not user.is_active:
         raise HTTPException(
@@ -92,7 +101,7 @@ def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     
-    refresh_token = create_refresh_token(user.id, db)
+    refresh_token = await create_refresh_token(user.id, db, **device_metadata(request))
     
     return {
         "access_token": access_token,
@@ -103,9 +112,18 @@ def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
 
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_token(
+    refresh_data: RefreshTokenRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
     """Обновление access токена с помощью refresh токена"""
-    user = verify_refresh_token(refresh_data.refresh_token, db)
+    new_refresh_token = None
+    if settings.refresh_token_rotation:
+        rotated = await rotate_refresh_token(refresh_data.refresh_token, db, **device_metadata(request))
+        user, new_refresh_token = rotated if rotated else (None, None)
+    else:
+        user = await verify_refresh_token(refresh_data.refresh_token, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -123,17 +141,18 @@ def refresh_token(refresh_data: RefreshTokenRequest, db: Session = Depends(get_d
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "expires_in": settings.access_token_expire_minutes * 60
-    }
+    return token_response(
+        access_token=access_token,
+        token_type="bearer",
+        expires_in=settings.access_token_expire_minutes * 60,
+        refresh_token=new_refresh_token
+    )
 
 
 @router.post("/logout")
-def logout(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+async def logout(refresh_data: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
     """Выход из системы (отзыв refresh токена)"""
-    success = revoke_refresh_token(refresh_data.refresh_token, db)
+    success = await revoke_refresh_token(refresh_data.refresh_token, db)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -143,7 +162,71 @@ def logout(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
     return {"message": "Successfully logged out"}
 
 
+@router.post("/logout-all")
+async def logout_all(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Выход со всех устройств (отзыв всех refresh токенов пользователя)"""
+    await revoke_all_refresh_tokens(current_user.id, db, current_user.username)
+    return {"message": "Successfully logged out from all sessions"}
+
+
+@router.get("/sessions", response_model=List[Session])
+async def read_sessions(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Активные сессии текущего пользователя"""
+    return await list_sessions(db, current_user.id)
+
+
+@router.delete("/sessions")
+async def delete_sessions(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Отзыв всех сессий текущего пользователя (то же, что /logout-all)"""
+    await revoke_all_refresh_tokens(current_user.id, db, current_user.username)
+    return {"message": "All sessions revoked"}
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(
+    session_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Отзыв одной сессии текущего пользователя"""
+    if not await revoke_session(db, current_user.id, session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    return {"message": "Session revoked"}
+
+
 @router.get("/me", response_model=User)
-def read_users_me(current_user: User = Depends(get_current_active_user)):
-    """Получение информации о текущем пользователе"""
-    return current_user
+async def read_users_me(request: Request, current_user: User = Depends(get_current_active_user)):
+    """Получение информации о текущем пользователе (If-None-Match -> 304)"""
+    # Принципал уже провалидирован при загрузке (обычно из кеша): ETag без запроса к БД
+    etag = user_etag(current_user)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified_response(etag)
+    return user_response(current_user, etag)
+
+
+@router.post("/introspect", response_model=IntrospectionResponse)
+async def introspect(
+    request: IntrospectionRequest,
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """Пакетная проверка access токенов для API шлюза (только для суперпользователей)"""
+    if len(request.tokens) > settings.introspection_max_tokens:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many tokens, maximum is {settings.introspection_max_tokens}"
+        )
+    
+    return {"results": await introspect_tokens(db, request.tokens)}
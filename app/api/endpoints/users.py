@@ -1,82 +1,137 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import io
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.auth import get_current_active_user, get_current_superuser
+from app.auth import get_current_active_user, get_current_superuser, revoke_all_refresh_tokens
+from app.bulk_import import detect_format, import_users
+from app.cache import user_version_cache
+from app.config import settings
 from app.crud import (
     get_user, get_users, create_user, update_user, delete_user,
-    deactivate_user, activate_user, get_user_by_email, get_user_by_username
+    deactivate_user, activate_user, UserConflictError,
+    encode_cursor, decode_cursor
 )
-from app.schemas import UserCreate, User, UserUpdate
-from app.models import User as UserModel
+from app.schemas import UserCreate, User, UserUpdate, UserImportReport, Session
+from app.serializers import (
+    etag_matches, not_modified_response, user_etag, user_response, users_response
+)
+from app.sessions import list_sessions, revoke_session
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[User])
-def read_users(
+async def read_users(
     skip: int = 0,
     limit: int = 100,
-    current_user: UserModel = Depends(get_current_superuser),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение списка пользователей (только для суперпользователей)"""
-    users = get_users(db, skip=skip, limit=limit)
-    return users
+    """Получение списка пользователей (только для суперпользователей)
+
+    Для постраничного обхода передайте cursor из заголовка X-Next-Cursor
+    предыдущего ответа: такой запрос не зависит от глубины страницы.
+    """
+    after_id = None
+    if cursor is not None:
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    users = await get_users(db, skip=skip, limit=limit, after_id=after_id)
+    response = users_response(users)
+    if users and len(users) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(users[-1].id)
+    return response
 
 
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_new_user(
+async def create_new_user(
     user: UserCreate,
-    current_user: UserModel = Depends(get_current_superuser),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
 ):
     """Создание нового пользователя (только для суперпользователей)"""
-    # Проверяем, что email не занят
-    if get_user_by_email(db, email=user.email):
+    try:
+        return await create_user(db=db, user=user)
+    except UserConflictError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=str(e)
         )
-    
-    # Проверяем, что username не занят
-    if get_user_by_username(db, username=user.username):
+
+
+@router.post("/import", response_model=UserImportReport)
+async def import_users_data(
+    file: UploadFile = File(...),
+    fmt: Optional[str] = Query(default=None, alias="format", pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(default=settings.user_import_batch_size, ge=1, le=10000),
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """Массовый импорт пользователей из CSV/NDJSON (только для суперпользователей)"""
+    fmt = fmt or detect_format(file.filename)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await import_users(db, stream, fmt, batch_size=batch_size)
+    except UnicodeDecodeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
+            detail="Import file must be UTF-8 encoded"
         )
-    
-    return create_user(db=db, user=user)
+    finally:
+        stream.detach()
 
 
 @router.get("/{user_id}", response_model=User)
-def read_user(
+async def read_user(
     user_id: int,
-    current_user: UserModel = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение пользователя по ID (пользователь может получить только свои данные, суперпользователь - любые)"""
+    """Получение пользователя по ID (пользователь может получить только свои данные, суперпользователь - любые)
+
+    Поддерживает If-None-Match: версия пользователя кешируется на несколько
+    секунд, поэтому 304 для неизмененного пользователя отдается без запроса к БД.
+    """
     if current_user.id != user_id and not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
     
-    user = get_user(db, user_id=user_id)
+    if_none_match = request.headers.get("if-none-match")
+    etag = user_version_cache.get(user_id)
+    if etag is not None and etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    
+    # Версия уходит в кеш, поэтому читается с основной БД
+    user = await get_user(db, user_id=user_id, use_primary=True)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user
+    etag = user_etag(user)
+    user_version_cache.set(user_id, etag)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    return user_response(user, etag)
 
 
 @router.put("/{user_id}", response_model=User)
-def update_user_data(
+async def update_user_data(
     user_id: int,
     user_update: UserUpdate,
-    current_user: UserModel = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновление пользователя (пользователь может обновить только свои данные, суперпользователь - любые)"""
     if current_user.id != user_id and not current_user.is_superuser:
@@ -85,7 +140,7 @@ def update_user_data(
             detail="Not enough permissions"
         )
     
-    user = update_user(db, user_id=user_id, user_update=user_update)
+    user = await update_user(db, user_id=user_id, user_update=user_update)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -95,13 +150,13 @@ def update_user_data(
 
 
 @router.delete("/{user_id}")
-def delete_user_data(
+async def delete_user_data(
     user_id: int,
-    current_user: UserModel = Depends(get_current_superuser),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
 ):
     """Удаление пользователя (только для суперпользователей)"""
-    success = delete_user(db, user_id=user_id)
+    success = await delete_user(db, user_id=user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -111,13 +166,13 @@ def delete_user_data(
 
 
 @router.post("/{user_id}/deactivate", response_model=User)
-def deactivate_user_data(
+async def deactivate_user_data(
     user_id: int,
-    current_user: UserModel = Depends(get_current_superuser),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
 ):
     """Деактивация пользователя (только для суперпользователей)"""
-    user = deactivate_user(db, user_id=user_id)
+    user = await deactivate_user(db, user_id=user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -127,16 +182,64 @@ def deactivate_user_data(
 
 
 @router.post("/{user_id}/activate", response_model=User)
-def activate_user_data(
+async def activate_user_data(
     user_id: int,
-    current_user: UserModel = Depends(get_current_superuser),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
 ):
     """Активация пользователя (только для суперпользователей)"""
-    user = activate_user(db, user_id=user_id)
+    user = await activate_user(db, user_id=user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     return user
+
+
+@router.get("/{user_id}/sessions", response_model=List[Session])
+async def read_user_sessions(
+    user_id: int,
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """Активные сессии пользователя (только для суперпользователей)"""
+    if await get_user(db, user_id=user_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return await list_sessions(db, user_id)
+
+
+@router.delete("/{user_id}/sessions")
+async def delete_user_sessions(
+    user_id: int,
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """Отзыв всех сессий пользователя (только для суперпользователей)"""
+    user = await get_user(db, user_id=user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    await revoke_all_refresh_tokens(user_id, db, user.username)
+    return {"message": "All sessions revoked"}
+
+
+@router.delete("/{user_id}/sessions/{session_id}")
+async def delete_user_session(
+    user_id: int,
+    session_id: int,
+    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """Отзыв одной сессии пользователя (только для суперпользователей)"""
+    if not await revoke_session(db, user_id, session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    return {"message": "Session revoked"}
@@ -1,31 +1,27 @@
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Dict, Iterable, List, Optional, Tuple
+from jose import JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import invalidate_user, principal_cache, token_cache
 from app.config import settings
+from app.crud import get_user, get_user_by_username
 from app.database import get_db
+from app.hashing import get_password_hash, password_hasher, verify_password
+from app.keys import keyring
 from app.models import User, RefreshToken
-from app.schemas import TokenData
+from app.revocation import revocation_index
+from app.schemas import TokenData, TokenIntrospection, User as Principal
+from app.sessions import session_activity
+from app.token_writer import refresh_token_writer
+import hashlib
 import secrets
+import time
 
-# Настройка хеширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Настройка JWT
-security = HTTPBearer()
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля"""
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    """Хеширование пароля"""
-    return pwd_context.hash(password)
+# Настройка JWT (отсутствие заголовка обрабатываем сами, чтобы всегда отвечать 403)
+security = HTTPBearer(auto_error=False)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -37,70 +33,277 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = keyring.sign(to_encode)
     return encoded_jwt
 
 
-def create_refresh_token(user_id: int, db: Session) -> str:
-    """Создание refresh токена"""
-    # Генерируем случайный токен
+def decode_access_token(token: str) -> dict:
+    """Декодирование access токена (проверенные claims кешируются до exp)"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = keyring.decode(token)
+        exp = payload.get("exp")
+        if exp is not None:
+            token_cache.set(token, payload, ttl=exp - time.time())
+    return payload
+
+
+def hash_refresh_token(token: str) -> str:
+    """SHA-256 digest refresh токена для хранения и поиска в БД"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _new_refresh_token(
+    user_id: int,
+    created_at: datetime,
+    user_agent: Optional[str] = None,
+    ip_address: Optional[str] = None
+) -> Tuple[RefreshToken, str]:
+    """Новый refresh токен и его строка в БД (хранится только digest)"""
     token = secrets.token_urlsafe(32)
-    
-    # Устанавливаем время истечения (30 дней)
-    expires_at = datetime.utcnow() + timedelta(days=30)
-    
-    # Сохраняем в базу данных
+    # created_at с микросекундами для сравнения с tokens_revoked_before; срок жизни 30 дней
     db_token = RefreshToken(
         user_id=user_id,
-        token=token,
-        expires_at=expires_at
+        token_hash=hash_refresh_token(token),
+        expires_at=created_at + timedelta(days=30),
+        created_at=created_at,
+        last_used_at=created_at,
+        user_agent=user_agent,
+        ip_address=ip_address
     )
+    return db_token, token
+
+
+async def create_refresh_token(
+    user_id: int,
+    db: AsyncSession,
+    user_agent: Optional[str] = None,
+    ip_address: Optional[str] = None
+) -> str:
+    """Создание refresh токена (в режиме write-behind - через очередь групповой записи)"""
+    db_token, token = _new_refresh_token(user_id, datetime.utcnow(), user_agent, ip_address)
+    if refresh_token_writer.running:
+        refresh_token_writer.enqueue({
+            "user_id": db_token.user_id,
+            "token_hash": db_token.token_hash,
+            "expires_at": db_token.expires_at,
+            "created_at": db_token.created_at,
+            "last_used_at": db_token.last_used_at,
+            "user_agent": db_token.user_agent,
+            "ip_address": db_token.ip_address,
+            "is_revoked": False,
+        })
+        return token
     db.add(db_token)
-    db.commit()
-    db.refresh(db_token)
+    await db.commit()
     
     return token
 
 
-def verify_refresh_token(token: str, db: Session) -> Optional[User]:
-    """Проверка refresh токена"""
-    db_token = db.query(RefreshToken).filter(
-        RefreshToken.token == token,
+def _active_token_criteria(token_hash: str, now: datetime) -> tuple:
+    """Условия действующего refresh токена"""
+    return (
+        RefreshToken.token_hash == token_hash,
         RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.utcnow()
-    ).first()
+        RefreshToken.expires_at > now,
+    )
+
+
+def _is_session_revoked(user: User, created_at: datetime) -> bool:
+    """Сессия выдана до "выхода везде" (по индексу или по данным пользователя из БД)"""
+    if revocation_index.is_session_revoked(user.id, created_at):
+        return True
+    if user.tokens_revoked_before is not None:
+        # Отзыв мог быть сделан другим воркером: источник истины - БД
+        revocation_index.revoke_user(user.id, user.tokens_revoked_before)
+        return revocation_index.is_session_revoked(user.id, created_at)
+    return False
+
+
+async def verify_refresh_token(token: str, db: AsyncSession) -> Optional[User]:
+    """Проверка refresh токена"""
+    token_hash = hash_refresh_token(token)
+    # Недавно отозванные токены отклоняем без запроса к БД
+    if revocation_index.is_revoked(token_hash):
+        return None
+    await refresh_token_writer.ensure_flushed(token_hash)
+    
+    # Токен и его пользователь одним запросом; только основная БД: реплика может
+    # еще не знать о только что выданном или отозванном токене
+    result = await db.execute(
+        select(User, RefreshToken.created_at)
+        .join(RefreshToken, RefreshToken.user_id == User.id)
+        .where(*_active_token_criteria(token_hash, datetime.utcnow()))
+        .execution_options(use_primary=True)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    user, created_at = row
+    if _is_session_revoked(user, created_at):
+        return None
+    # last_used_at пишется пачкой в фоне, а не отдельным UPDATE на каждый /refresh
+    session_activity.touch(token_hash, datetime.utcnow())
+    return user
+
+
+def rotation_statement(token_hash: str, now: datetime):
+    """Отзыв токена и загрузка пользователя одним запросом (PostgreSQL, data-modifying CTE)"""
+    rotated = (
+        update(RefreshToken)
+        .where(*_active_token_criteria(token_hash, now))
+        .values(is_revoked=True)
+        .returning(RefreshToken.user_id, RefreshToken.created_at)
+        .cte("rotated")
+    )
+    return (
+        select(User, rotated.c.created_at)
+        .join(rotated, User.id == rotated.c.user_id)
+        .execution_options(use_primary=True)
+    )
+
+
+async def _revoke_for_rotation(db: AsyncSession, token_hash: str, now: datetime):
+    """Атомарный отзыв токена для ротации: (user_id, created_at) или None, если токен уже недействителен"""
+    revoke = (
+        update(RefreshToken)
+        .where(*_active_token_criteria(token_hash, now))
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        result = await db.execute(revoke.returning(RefreshToken.user_id, RefreshToken.created_at))
+        return result.first()
     
-    if not db_token:
+    # Без RETURNING (SQLite < 3.35): чтение и условный UPDATE, выигрывает один из конкурентов
+    result = await db.execute(
+        select(RefreshToken.id, RefreshToken.user_id, RefreshToken.created_at)
+        .where(*_active_token_criteria(token_hash, now))
+        .execution_options(use_primary=True)
+    )
+    row = result.first()
+    if row is None:
         return None
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.is_revoked == False)
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    return (row.user_id, row.created_at) if result.rowcount == 1 else None
+
+
+async def rotate_refresh_token(
+    token: str,
+    db: AsyncSession,
+    user_agent: Optional[str] = None,
+    ip_address: Optional[str] = None
+) -> Optional[Tuple[User, Optional[str]]]:
+    """Ротация refresh токена: старый отзывается и выдается новый в одной транзакции
+
+    Повторное предъявление уже замененного токена отклоняется. Для неактивного
+    пользователя ничего не записывается и возвращается (user, None).
+    """
+    token_hash = hash_refresh_token(token)
+    if revocation_index.is_revoked(token_hash):
+        return None
+    await refresh_token_writer.ensure_flushed(token_hash)
     
-    return db.query(User).filter(User.id == db_token.user_id).first()
+    now = datetime.utcnow()
+    if db.get_bind().dialect.name == "postgresql":
+        row = (await db.execute(rotation_statement(token_hash, now))).first()
+    else:
+        # SQLite не возвращает столбцы присоединенных таблиц из UPDATE ... RETURNING
+        revoked = await _revoke_for_rotation(db, token_hash, now)
+        row = None
+        if revoked is not None:
+            user_id, created_at = revoked
+            user = await get_user(db, user_id)
+            row = (user, created_at) if user is not None else None
+    
+    if row is None:
+        await db.rollback()
+        return None
+    user, created_at = row
+    if _is_session_revoked(user, created_at):
+        await db.rollback()
+        return None
+    if not user.is_active:
+        # Старый токен остается как есть, новая сессия не создается; объект
+        # отсоединяется, чтобы откат не сбросил его загруженные поля
+        db.expunge(user)
+        await db.rollback()
+        return user, None
+    
+    db_token, new_token = _new_refresh_token(user.id, now, user_agent, ip_address)
+    db.add(db_token)
+    await db.commit()
+    revocation_index.revoke(token_hash)
+    return user, new_token
 
 
-def revoke_refresh_token(token: str, db: Session) -> bool:
-    """Отзыв refresh токена"""
-    db_token = db.query(RefreshToken).filter(RefreshToken.token == token).first()
-    if db_token:
-        db_token.is_revoked = True
-        db.commit()
-        return True
-    return False
+async def revoke_refresh_token(token: str, db: AsyncSession) -> bool:
+    """Отзыв refresh токена одним UPDATE (False, если токен не найден)"""
+    token_hash = hash_refresh_token(token)
+    await refresh_token_writer.ensure_flushed(token_hash)
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == token_hash)
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount == 0:
+        return False
+    revocation_index.revoke(token_hash)
+    return True
 
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-    """Аутентификация пользователя"""
-    user = db.query(User).filter(User.username == username).first()
+async def revoke_all_refresh_tokens(user_id: int, db: AsyncSession, username: str) -> None:
+    """Отзыв всех refresh токенов пользователя одной записью в users"""
+    revoked_before = datetime.utcnow()
+    await db.execute(
+        update(User).where(User.id == user_id).values(tokens_revoked_before=revoked_before)
+    )
+    await db.commit()
+    revocation_index.revoke_user(user_id, revoked_before)
+    # updated_at изменился: прежний ETag и снимок в кеше принципалов больше не действительны
+    invalidate_user(user_id, username)
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    """Аутентификация пользователя (хеширование выполняется в пуле процессов)"""
+    user = await get_user_by_username(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash is not None:
+        # Хеш устарел (другая схема или стоимость): постепенная миграция при входе.
+        # Пользователь мог быть прочитан с отстающей реплики, поэтому хеш сверяется
+        # с основной БД: иначе пересчет старого пароля затер бы уже сделанную смену
+        primary_hash = await db.scalar(
+            select(User.hashed_password).where(User.id == user.id).execution_options(use_primary=True)
+        )
+        if primary_hash == user.hashed_password:
+            user.hashed_password = new_hash
+            await db.commit()
+            invalidate_user(user.id, user.username)
     return user
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Получение текущего пользователя из токена"""
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """Получение текущего пользователя из токена (снимок из кеша или БД)"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authenticated"
+        )
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -108,7 +311,7 @@ def get_current_user(
     )
     
     try:
-        payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=[settings.algorithm])
+        payload = decode_access_token(credentials.credentials)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -116,20 +319,70 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+    principal = (await load_principals(db, [token_data.username])).get(token_data.username)
+    if principal is None:
         raise credentials_exception
-    return user
+    return principal
+
+
+async def load_principals(db: AsyncSession, usernames: Iterable[str]) -> Dict[str, Principal]:
+    """Снимки пользователей по username: из кеша, остальные одним IN-запросом"""
+    principals: Dict[str, Principal] = {}
+    missing: List[str] = []
+    for username in set(usernames):
+        principal = principal_cache.get(username)
+        if principal is None:
+            missing.append(username)
+        else:
+            principals[username] = principal
+    
+    if missing:
+        # Снимки уходят в кеш, поэтому читаются с основной БД, а не с отстающей реплики
+        result = await db.execute(
+            select(User).where(User.username.in_(missing)).execution_options(use_primary=True)
+        )
+        for user in result.scalars().all():
+            principal = Principal.model_validate(user)
+            principal_cache.set(user.username, principal)
+            principals[user.username] = principal
+    return principals
+
+
+async def introspect_tokens(db: AsyncSession, tokens: List[str]) -> List[TokenIntrospection]:
+    """Пакетная проверка access токенов (та же логика, что и в get_current_user)"""
+    payloads: List[Optional[dict]] = []
+    for token in tokens:
+        try:
+            payload = decode_access_token(token)
+        except JWTError:
+            payload = None
+        payloads.append(payload if payload and payload.get("sub") else None)
+    
+    principals = await load_principals(db, [payload["sub"] for payload in payloads if payload])
+    results = []
+    for payload in payloads:
+        principal = principals.get(payload["sub"]) if payload else None
+        if principal is None:
+            results.append(TokenIntrospection(active=False))
+            continue
+        results.append(TokenIntrospection(
+            active=principal.is_active,
+            sub=payload["sub"],
+            exp=payload.get("exp"),
+            claims=payload,
+            user=principal,
+        ))
+    return results
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """Получение активного пользователя"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
-def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_superuser(current_user: Principal = Depends(get_current_user)) -> Principal:
     """Получение суперпользователя"""
     if not current_user.is_superuser:
         raise HTTPException(
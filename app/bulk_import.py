@@ -0,0 +1,191 @@
+import csv
+import json
+import time
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.hashing import is_password_hash, password_hasher
+from app.models import User
+from app.schemas import UserImportError, UserImportRecord, UserImportReport
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def detect_format(filename: Optional[str]) -> str:
+    """Определение формата файла импорта по расширению"""
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Потоковое чтение записей (номер строки, сырые данные) из CSV или NDJSON"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Пустые ячейки считаем отсутствующими полями
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}
+    elif fmt == "ndjson":
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_num, e
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def format_validation_error(exc: ValidationError) -> str:
+    """Краткое описание ошибок валидации записи"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'record'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+class UserImporter:
+    """Пакетный импорт пользователей
+
+    Файл читается, разбирается и валидируется пачками в пуле потоков. Записи
+    проверяются на конфликты email/username множествами
+    (внутри файла и одним IN-запросом к БД на пачку), пароли пачки хешируются
+    параллельно в пуле процессов, вставка выполняется одним executemany на пачку.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = 1000):
+        self.db = db
+        self.batch_size = batch_size
+        self.total = 0
+        self.created = 0
+        self.errors: List[UserImportError] = []
+        self._seen_emails = set()
+        self._seen_usernames = set()
+
+    def _fail(self, line: int, error: str) -> None:
+        self.errors.append(UserImportError(line=line, error=error))
+
+    async def run(self, records: Iterable[Tuple[int, object]]) -> UserImportReport:
+        """Импорт всех записей и формирование отчета"""
+        start = time.perf_counter()
+        records = iter(records)
+        while True:
+            # Чтение файла, разбор и валидация - в пуле потоков: большой файл не блокирует цикл событий
+            batch, exhausted = await run_in_threadpool(self._read_batch, records)
+            if batch:
+                await self._import_batch(batch)
+            if exhausted:
+                break
+
+        elapsed = time.perf_counter() - start
+        return UserImportReport(
+            total=self.total,
+            created=self.created,
+            failed=len(self.errors),
+            errors=sorted(self.errors, key=lambda error: error.line),
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(self.total / elapsed, 1) if elapsed else 0.0,
+        )
+
+    def _read_batch(self, records: Iterator[Tuple[int, object]]) -> Tuple[List[Tuple[int, UserImportRecord]], bool]:
+        """Следующая пачка прошедших валидацию записей и признак конца потока"""
+        batch: List[Tuple[int, UserImportRecord]] = []
+        for line, raw in records:
+            self.total += 1
+            record = self._validate(line, raw)
+            if record is None:
+                continue
+            batch.append((line, record))
+            if len(batch) >= self.batch_size:
+                return batch, False
+        return batch, True
+
+    def _validate(self, line: int, raw: object) -> Optional[UserImportRecord]:
+        if isinstance(raw, Exception):
+            self._fail(line, f"Invalid JSON: {raw}")
+            return None
+        try:
+            record = UserImportRecord.model_validate(raw)
+        except ValidationError as e:
+            self._fail(line, format_validation_error(e))
+            return None
+        if record.hashed_password is not None and not is_password_hash(record.hashed_password):
+            self._fail(line, "Unsupported password hash")
+            return None
+        if record.email in self._seen_emails:
+            self._fail(line, "Duplicate email in import")
+            return None
+        if record.username in self._seen_usernames:
+            self._fail(line, "Duplicate username in import")
+            return None
+        self._seen_emails.add(record.email)
+        self._seen_usernames.add(record.username)
+        return record
+
+    async def _import_batch(self, batch: List[Tuple[int, UserImportRecord]]) -> None:
+        # Конфликты с существующими пользователями: по одному IN-запросу на поле
+        emails = [record.email for _, record in batch]
+        usernames = [record.username for _, record in batch]
+        existing_emails = set(
+            (await self.db.execute(select(User.email).where(User.email.in_(emails)))).scalars()
+        )
+        existing_usernames = set(
+            (await self.db.execute(select(User.username).where(User.username.in_(usernames)))).scalars()
+        )
+
+        accepted = []
+        for line, record in batch:
+            if record.email in existing_emails:
+                self._fail(line, "Email already registered")
+            elif record.username in existing_usernames:
+                self._fail(line, "Username already taken")
+            else:
+                accepted.append((line, record))
+        if not accepted:
+            return
+
+        # Хешируем только прошедшие проверки пароли
+        plain = [(index, record.password) for index, (_, record) in enumerate(accepted)
+                 if record.hashed_password is None]
+        hashes = await password_hasher.hash_many([password for _, password in plain])
+        hashed_passwords = {index: hashed for (index, _), hashed in zip(plain, hashes)}
+
+        rows = [
+            {
+                "email": record.email,
+                "username": record.username,
+                "hashed_password": hashed_passwords.get(index, record.hashed_password),
+                "is_active": record.is_active,
+                "is_superuser": record.is_superuser,
+            }
+            for index, (_, record) in enumerate(accepted)
+        ]
+        try:
+            await self.db.execute(insert(User), rows)
+            await self.db.commit()
+            self.created += len(rows)
+        except IntegrityError:
+            # Гонка с параллельной регистрацией: вставляем построчно, чтобы найти виновника
+            await self.db.rollback()
+            for (line, _), row in zip(accepted, rows):
+                try:
+                    await self.db.execute(insert(User), [row])
+                    await self.db.commit()
+                    self.created += 1
+                except IntegrityError:
+                    await self.db.rollback()
+                    self._fail(line, "Email or username already exists")
+
+
+async def import_users(
+    db: AsyncSession,
+    stream: TextIO,
+    fmt: str,
+    batch_size: int = 1000
+) -> UserImportReport:
+    """Импорт пользователей из CSV/NDJSON потока"""
+    return await UserImporter(db, batch_size=batch_size).run(iter_records(stream, fmt))
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from app.config import settings
+from app.metrics import register_cache
+
+
+class TTLCache:
+    """Ограниченный LRU-кеш с временем жизни записей и счетчиками попаданий
+
+    maxsize == 0 отключает кеш: записи не сохраняются, все обращения - промахи.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получение значения (None при промахе или истекшей записи)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохранение значения (ttl переопределяет время жизни по умолчанию)"""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаление записи"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистка кеша и счетчиков"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Статистика кеша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+# Кеш принципалов (снимков пользователя) для get_current_user, ключ - username
+principal_cache = TTLCache(
+    maxsize=settings.principal_cache_size if settings.principal_cache_enabled else 0,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+
+# Кеш проверенных claims access токенов, ключ - сам токен, запись истекает по exp
+token_cache = TTLCache(
+    maxsize=settings.token_cache_size if settings.token_cache_enabled else 0,
+    ttl=settings.access_token_expire_minutes * 60,
+)
+
+# Версии (ETag) пользователей для условных GET, ключ - id пользователя. Сброс по
+# invalidate_user действует только в своем процессе, поэтому время жизни короткое
+user_version_cache = TTLCache(
+    maxsize=settings.principal_cache_size if settings.principal_cache_enabled else 0,
+    ttl=settings.user_version_cache_ttl_seconds,
+)
+
+register_cache("principal", principal_cache)
+register_cache("token", token_cache)
+register_cache("user_version", user_version_cache)
+
+
+def invalidate_user(user_id: int, *usernames: str) -> None:
+    """Сброс снимков и версии пользователя после его изменения"""
+    for username in usernames:
+        principal_cache.invalidate(username)
+    user_version_cache.invalidate(user_id)
@@ -1,15 +1,91 @@
+from pydantic import PositiveInt
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
     # База данных - используем SQLite для локальной разработки
     database_url: str = "sqlite:///./auth_service.db"
+    # Реплики для чтения (JSON список URL): SELECT вне транзакций с записью идут в реплику
+    database_replica_urls: List[str] = []
+    
+    # Пул соединений (для SQLite в памяти не применяется)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
+    
+    # Профиль SQLite: WAL позволяет читать во время записи, NORMAL в WAL безопасен
+    # при сбое процесса, busy_timeout - ожидание блокировки вместо "database is locked"
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
     
     # JWT настройки
     secret_key: str = "your-super-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Ротация refresh токенов: /refresh отзывает предъявленный токен и выдает новый
+    refresh_token_rotation: bool = False
+    # Отложенная запись refresh токенов пачками (группа фиксируется по размеру или задержке)
+    refresh_token_write_behind: bool = False
+    refresh_token_flush_size: int = 500
+    refresh_token_flush_delay_ms: int = 5
+    # Ключи для RS*/ES*: каталог с <kid>.pem (активные) и <kid>.pub.pem (выведенные из ротации)
+    jwt_keys_dir: Optional[str] = None
+    jwt_active_kid: Optional[str] = None
+    jwks_max_age_seconds: int = 300
+    # Максимум токенов в одном запросе пакетной проверки
+    introspection_max_tokens: int = 100
+    
+    # Хеширование паролей: число процессов пула (None - по числу ядер, 0 - без пула)
+    password_hash_workers: Optional[int] = None
+    # Схема и стоимость хеширования (подбираются scripts/calibrate_password_hash.py)
+    password_hash_scheme: str = "bcrypt"
+    password_hash_rounds: Optional[int] = None
+    
+    # Кеш пользователей для get_current_user
+    principal_cache_enabled: bool = True
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: int = 60
+    # Версии (ETag) пользователей: по ним 304 отдается без БД, а изменение из
+    # другого процесса станет видно только после истечения записи
+    user_version_cache_ttl_seconds: int = 2
+    
+    # Кеш проверенных access токенов (запись живет до exp токена)
+    token_cache_enabled: bool = True
+    token_cache_size: int = 50000
+    
+    # Фоновая очистка истекших и отозванных refresh токенов
+    token_purge_enabled: bool = True
+    token_purge_interval_seconds: int = 3600
+    token_purge_batch_size: int = 1000
+    token_purge_batch_pause_ms: int = 50
+    
+    # Время последнего использования сессий копится в памяти и пишется раз в интервал
+    session_activity_flush_seconds: int = 30
+    
+    # Массовый импорт пользователей
+    user_import_batch_size: int = 1000
+    
+    # Индекс отзыва refresh токенов (ограниченное множество недавно отозванных)
+    revocation_index_preload: bool = True
+    revocation_recent_size: int = 100000
+    
+    # Ограничение частоты попыток входа (скользящее окно по username и IP)
+    login_rate_limit_enabled: bool = True
+    login_rate_limit_per_username: PositiveInt = 10
+    login_rate_limit_per_ip: PositiveInt = 100
+    login_rate_limit_window_seconds: PositiveInt = 60
+    login_rate_limit_max_keys: int = 100000
+    
+    # Проверка схемы БД при старте: error - не запускаться, если схема отстает
+    # от alembic head, warn - только предупреждение, skip - без проверки
+    schema_check: str = "error"
+    
+    # Метрики Prometheus (/metrics)
+    metrics_enabled: bool = True
     
     # Настройки приложения
     app_name: str = "Auth Service"
@@ -1,94 +1,211 @@
-from sqlalchemy.orm import Session
+import base64
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import invalidate_user
 from app.models import User
 from app.schemas import UserCreate, UserUpdate
-from app.auth import get_password_hash
-from typing import Optional
+from app.hashing import password_hasher
+from typing import List, Optional
 
+# Сообщения об ошибке для занятых полей пользователя
+USER_CONFLICT_MESSAGES = {
+    "email": "Email already registered",
+    "username": "Username already taken",
+}
 
-def get_user(db: Session, user_id: int) -> Optional[User]:
-    """Получение пользователя по ID"""
-    return db.query(User).filter(User.id == user_id).first()
 
+class UserConflictError(Exception):
+    """Email или username уже заняты (field - занятое поле)"""
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    def __init__(self, field: str):
+        self.field = field
+        super().__init__(USER_CONFLICT_MESSAGES[field])
+
+
+async def get_user(db: AsyncSession, user_id: int, use_primary: bool = False) -> Optional[User]:
+    """Получение пользователя по ID
+
+    use_primary=True читает основную БД: нужно, когда результат уходит в кеш
+    или в запись, а реплика может отставать.
+    """
+    result = await db.execute(
+        select(User).where(User.id == user_id).execution_options(use_primary=use_primary)
+    )
+    return result.scalars().first()
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Получение пользователя по email"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
 
-def get_user_by_username(db: Session, username: str) -> Optional[User]:
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
     """Получение пользователя по username"""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+def encode_cursor(user_id: int) -> str:
+    """Непрозрачный курсор страницы по ID последнего пользователя"""
+    return base64.urlsafe_b64encode(f"id:{user_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Разбор курсора страницы (ValueError для некорректного курсора)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    prefix, _, user_id = raw.partition(":")
+    if prefix != "id" or not user_id.isdigit():
+        raise ValueError("Invalid cursor")
+    return int(user_id)
+
+
+async def get_users(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None
+) -> List[User]:
+    """Получение списка пользователей с пагинацией
+
+    При заданном after_id используется keyset-пагинация по User.id (skip игнорируется),
+    иначе - offset/limit. Порядок в обоих случаях стабильный, по User.id.
+    """
+    query = select(User).order_by(User.id).limit(limit)
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def find_user_conflict(db: AsyncSession, email: str, username: str) -> Optional[str]:
+    """Занятое поле (email проверяется первым) одним запросом или None"""
+    result = await db.execute(
+        select(User.email, User.username)
+        .where(or_(User.email == email, User.username == username))
+        .limit(2)
+    )
+    rows = result.all()
+    if any(row.email == email for row in rows):
+        return "email"
+    if rows:
+        return "username"
+    return None
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    """Получение списка пользователей с пагинацией"""
-    return db.query(User).offset(skip).limit(limit).all()
+USERNAME_CONSTRAINTS = ("ix_users_username", "users.username")
 
 
-def create_user(db: Session, user: UserCreate) -> User:
-    """Создание нового пользователя"""
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
+def conflict_field(exc: IntegrityError) -> str:
+    """Поле нарушенного ограничения уникальности users по имени ограничения"""
+    orig = exc.orig
+    # psycopg отдает имя в diag, asyncpg - в исключении, которое оборачивает адаптер SQLAlchemy
+    constraint = (
+        getattr(getattr(orig, "diag", None), "constraint_name", None)
+        or getattr(orig, "constraint_name", None)
+        or getattr(orig.__cause__, "constraint_name", None)
+    )
+    if constraint is None:
+        # SQLite: "UNIQUE constraint failed: users.username"; строки DETAIL со
+        # значениями (в них может быть что угодно) в разбор не попадают
+        message = (str(orig).splitlines() or [""])[0]
+        constraint = next((name for name in USERNAME_CONSTRAINTS if name in message), None)
+    return "username" if constraint in USERNAME_CONSTRAINTS else "email"
+
+
+async def create_user(
+    db: AsyncSession,
+    user: UserCreate,
+    hashed_password: Optional[str] = None
+) -> User:
+    """Создание нового пользователя (хеш можно передать заранее вычисленным)
+
+    Занятость email/username проверяется одним запросом до дорогого хеширования
+    пароля, сама вставка - один INSERT ... RETURNING. Гонку между проверкой и
+    вставкой закрывают ограничения уникальности: IntegrityError превращается в
+    UserConflictError с тем же сообщением.
+    """
+    field = await find_user_conflict(db, user.email, user.username)
+    if field:
+        raise UserConflictError(field)
+
+    if hashed_password is None:
+        hashed_password = await password_hasher.hash(user.password)
+    statement = insert(User).values(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    ).returning(User)
+    try:
+        db_user = (await db.execute(statement)).scalar_one()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise UserConflictError(conflict_field(e)) from e
     return db_user
 
 
-def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
+async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate) -> Optional[User]:
     """Обновление пользователя"""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id, use_primary=True)
     if not db_user:
         return None
-    
+
     update_data = user_update.dict(exclude_unset=True)
-    
+    old_username = db_user.username
+
     # Хешируем пароль если он обновляется
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
-    
+        update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
+
     for field, value in update_data.items():
         setattr(db_user, field, value)
-    
-    db.commit()
-    db.refresh(db_user)
+
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_user(db_user.id, old_username, db_user.username)
     return db_user
 
 
-def delete_user(db: Session, user_id: int) -> bool:
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
     """Удаление пользователя"""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id, use_primary=True)
     if not db_user:
         return False
-    
-    db.delete(db_user)
-    db.commit()
+
+    await db.delete(db_user)
+    await db.commit()
+    invalidate_user(db_user.id, db_user.username)
     return True
 
 
-def deactivate_user(db: Session, user_id: int) -> Optional[User]:
+async def deactivate_user(db: AsyncSession, user_id: int) -> Optional[User]:
     """Деактивация пользователя"""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id, use_primary=True)
     if not db_user:
         return None
-    
+
     db_user.is_active = False
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_user(db_user.id, db_user.username)
     return db_user
 
 
-def activate_user(db: Session, user_id: int) -> Optional[User]:
+async def activate_user(db: AsyncSession, user_id: int) -> Optional[User]:
     """Активация пользователя"""
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id, use_primary=True)
     if not db_user:
         return None
-    
+
     db_user.is_active = True
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_user(db_user.id, db_user.username)
     return db_user
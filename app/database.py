@@ -1,28 +1,212 @@
-from sqlalchemy import create_engine
+import random
+import threading
+import time
+from typing import List, Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.metrics import instrument_engine
 
-# Создание движка базы данных с поддержкой SQLite
-if settings.database_url.startswith("sqlite"):
-    engine = create_engine(
-        settings.database_url, 
-        connect_args={"check_same_thread": False}
+# Соответствие синхронных и асинхронных драйверов
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+SYNC_DRIVERS = {value: key for key, value in ASYNC_DRIVERS.items()}
+
+
+def get_async_database_url(url: str) -> str:
+    """URL базы данных с асинхронным драйвером"""
+    database_url = make_url(url)
+    if database_url.drivername in SYNC_DRIVERS:
+        return url
+    driver = ASYNC_DRIVERS.get(database_url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Unsupported database for async mode: {database_url.drivername}")
+    return database_url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def get_sync_database_url(url: str) -> str:
+    """URL базы данных с синхронным драйвером (миграции, скрипты)"""
+    database_url = make_url(url)
+    driver = SYNC_DRIVERS.get(database_url.drivername)
+    if driver is None:
+        return url
+    return database_url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def get_pool_options(url: str) -> dict:
+    """Параметры пула соединений из настроек (SQLite в памяти живет в одном соединении)"""
+    database_url = make_url(url)
+    if database_url.get_backend_name() == "sqlite" and database_url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Профиль SQLite для каждого нового соединения"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.close()
+
+
+class PoolStats:
+    """Статистика ожидания соединений из пула"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict:
+        attempts = self.checkouts + self.timeouts
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул асинхронного движка с замером времени ожидания соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+class RoutingSession(Session):
+    """Сессия с чтением из реплик
+
+    SELECT выполняется на реплике, выбранной один раз на сессию (чтения одного
+    запроса видят согласованный снимок). Запись (flush, INSERT/UPDATE/DELETE,
+    SELECT ... FOR UPDATE, execution_options(use_primary=True)) идет в основную
+    БД, и после первой записи все чтения сессии до ее закрытия тоже остаются на
+    основной БД: отставание реплики не скрывает только что записанные данные.
+    """
+
+    def __init__(self, *args, replicas: Sequence[Engine] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = list(replicas)
+        self._replica: Optional[Engine] = None
+        self._use_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+        if not self.replicas or self._use_primary:
+            return primary
+        if self._flushing or not self._is_replica_read(clause):
+            self._use_primary = True
+            return primary
+        if self._replica is None:
+            self._replica = random.choice(self.replicas)
+        return self._replica
+
+    @staticmethod
+    def _is_replica_read(clause) -> bool:
+        if clause is None or not getattr(clause, "is_select", False) or clause.is_dml:
+            return False
+        if getattr(clause, "_for_update_arg", None) is not None:
+            return False
+        return not clause.get_execution_options().get("use_primary", False)
+
+
+def get_pool_status(engine: Engine) -> dict:
+    """Текущее состояние пула: занятые соединения, переполнение, ожидание"""
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
+
+
+def create_app_async_engine(url: str):
+    """Асинхронный движок с пулом из настроек, профилем SQLite и метриками"""
+    database_url = get_async_database_url(url)
+    pool_options = get_pool_options(database_url)
+    if pool_options:
+        pool_options["poolclass"] = InstrumentedAsyncQueuePool
+    engine = create_async_engine(database_url, **pool_options)
+    if is_sqlite(database_url):
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+def create_async_sessionmaker(engine, replicas: Sequence = ()) -> async_sessionmaker:
+    """Фабрика асинхронных сессий (с репликами - маршрутизирующая RoutingSession)"""
+    options = {}
+    if replicas:
+        options = {
+            "sync_session_class": RoutingSession,
+            "replicas": [replica.sync_engine for replica in replicas],
+        }
+    return async_sessionmaker(
+        engine, class_=AsyncSession, autoflush=False, expire_on_commit=False, **options
     )
-else:
-    engine = create_engine(settings.database_url)
 
-# Создание фабрики сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Асинхронный движок: используется всеми endpoints
+async_engine = create_app_async_engine(settings.database_url)
+# Реплики только для чтения
+replica_engines: List = [create_app_async_engine(url) for url in settings.database_replica_urls]
+
+# Создание фабрики асинхронных сессий
+AsyncSessionLocal = create_async_sessionmaker(async_engine, replica_engines)
 
 # Базовый класс для моделей
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency для получения сессии базы данных"""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency для получения асинхронной сессии базы данных"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,151 @@
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from app.config import settings
+from app.metrics import password_hash_duration_seconds
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# Поддерживаемые схемы: хеши любой из них проверяются, но при входе
+# пересчитываются в основную схему (argon2 требует пакет argon2-cffi)
+SUPPORTED_SCHEMES = ("bcrypt", "argon2", "pbkdf2_sha256")
+
+
+def build_crypt_context(scheme: str = "bcrypt", rounds: Optional[int] = None) -> "CryptContext":
+    """Контекст хеширования с основной схемой и ее стоимостью
+
+    rounds - стоимость схемы (bcrypt: log2 раундов, argon2: time_cost, pbkdf2: итерации).
+    Хеши с другой стоимостью или схемой считаются устаревшими (needs_update).
+    """
+    from passlib.context import CryptContext
+
+    if scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+    schemes = [scheme] + [other for other in SUPPORTED_SCHEMES if other != scheme]
+    options = {}
+    if rounds is not None:
+        for option in ("default_rounds", "min_rounds", "max_rounds"):
+            options[f"{scheme}__{option}"] = rounds
+    return CryptContext(schemes=schemes, default=scheme, deprecated="auto", **options)
+
+
+_pwd_context: Optional["CryptContext"] = None
+
+
+def get_pwd_context() -> "CryptContext":
+    """Контекст хеширования из настроек
+
+    Создается при первом использовании: основному процессу passlib обычно не нужен,
+    хеширование выполняется в пуле процессов.
+    """
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = build_crypt_context(settings.password_hash_scheme, settings.password_hash_rounds)
+    return _pwd_context
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля"""
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def get_password_hash(password: str) -> str:
+    """Хеширование пароля"""
+    return get_pwd_context().hash(password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Проверка пароля и новый хеш, если текущий устарел"""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def measure_verify_time(scheme: str, rounds: int, samples: int = 3) -> float:
+    """Медианное время проверки пароля (секунды) для схемы и стоимости на этом хосте"""
+    context = build_crypt_context(scheme, rounds)
+    hashed = context.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def is_password_hash(value: str) -> bool:
+    """Проверка, что строка - хеш одной из поддерживаемых схем"""
+    return get_pwd_context().identify(value) is not None
+
+
+def _warm_up_worker() -> None:
+    get_pwd_context()
+
+
+class PasswordHasher:
+    """Сервис хеширования паролей в отдельном пуле процессов
+
+    bcrypt занимает сотни миллисекунд CPU, поэтому вычисления выносятся из общего
+    threadpool Starlette в процессы, а endpoints только ожидают результат.
+    При workers == 0 хеширование выполняется в стандартном executor цикла событий.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn: дочерние процессы не наследуют потоки и соединения с БД
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def warm_up(self) -> None:
+        """Фоновый запуск процессов пула, чтобы первый вход не ждал их старта"""
+        executor = self._get_executor()
+        if executor is not None:
+            for _ in range(self.workers):
+                executor.submit(_warm_up_worker)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Асинхронная проверка пароля"""
+        loop = asyncio.get_running_loop()
+        with password_hash_duration_seconds.time("verify"):
+            return await loop.run_in_executor(
+                self._get_executor(), verify_password, plain_password, hashed_password
+            )
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Асинхронная проверка пароля с пересчетом устаревшего хеша"""
+        loop = asyncio.get_running_loop()
+        with password_hash_duration_seconds.time("verify"):
+            return await loop.run_in_executor(
+                self._get_executor(), verify_and_update_password, plain_password, hashed_password
+            )
+
+    async def hash(self, password: str) -> str:
+        """Асинхронное хеширование пароля"""
+        loop = asyncio.get_running_loop()
+        with password_hash_duration_seconds.time("hash"):
+            return await loop.run_in_executor(self._get_executor(), get_password_hash, password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Параллельное хеширование списка паролей на всех процессах пула"""
+        return list(await asyncio.gather(*(self.hash(password) for password in passwords)))
+
+    def shutdown(self) -> None:
+        """Остановка пула процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers)
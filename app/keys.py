@@ -0,0 +1,154 @@
+import os
+from typing import Dict, Optional
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+from app.cache import token_cache
+from app.config import settings
+from app.metrics import jwt_duration_seconds
+
+# Асимметричные алгоритмы подписи, поддерживаемые python-jose
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512")
+
+PRIVATE_KEY_SUFFIX = ".pem"
+PUBLIC_KEY_SUFFIX = ".pub.pem"
+
+# Кривые для ES* алгоритмов
+EC_CURVES = {"ES256": "SECP256R1", "ES384": "SECP384R1", "ES512": "SECP521R1"}
+
+
+def generate_private_key_pem(algorithm: str, key_size: int = 2048) -> str:
+    """Генерация закрытого ключа в PEM (PKCS8) для алгоритма подписи (key_size - только для RS*)"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    elif algorithm in EC_CURVES:
+        private_key = ec.generate_private_key(getattr(ec, EC_CURVES[algorithm])())
+    else:
+        raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def retire_key(keys_dir: str, kid: str, algorithm: str) -> None:
+    """Вывод ключа из ротации: остается только открытая часть для проверки"""
+    private_path = os.path.join(keys_dir, kid + PRIVATE_KEY_SUFFIX)
+    with open(private_path) as key_file:
+        public_key = jwk.construct(key_file.read(), algorithm).public_key()
+    with open(os.path.join(keys_dir, kid + PUBLIC_KEY_SUFFIX), "w") as key_file:
+        key_file.write(public_key.to_pem().decode())
+    os.remove(private_path)
+
+
+class KeyRing:
+    """Набор ключей подписи JWT
+
+    Для HS* используется общий secret_key. Для RS*/ES* ключи читаются из каталога:
+    <kid>.pem - закрытый ключ (подпись и проверка), <kid>.pub.pem - открытый ключ
+    выведенного из ротации kid, который еще принимается при проверке, пока не истекут
+    подписанные им токены. Токены подписываются активным ключом с заголовком kid.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret_key: str,
+        keys_dir: Optional[str] = None,
+        active_kid: Optional[str] = None
+    ):
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self._private_keys: Dict[str, Key] = {}
+        self._public_keys: Dict[str, Key] = {}
+        self._jwks: Dict[str, dict] = {}
+        self._signing_kid: Optional[str] = None
+        if self.is_asymmetric:
+            self.reload()
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def reload(self) -> None:
+        """Перечитывание ключей из каталога (PEM разбирается один раз, а не на каждый токен)"""
+        if not self.keys_dir or not os.path.isdir(self.keys_dir):
+            raise ValueError(f"JWT keys directory is required for {self.algorithm}: {self.keys_dir}")
+
+        private_keys: Dict[str, Key] = {}
+        public_keys: Dict[str, Key] = {}
+        jwks: Dict[str, dict] = {}
+        for filename in sorted(os.listdir(self.keys_dir)):
+            path = os.path.join(self.keys_dir, filename)
+            if filename.endswith(PUBLIC_KEY_SUFFIX):
+                kid, is_private = filename[:-len(PUBLIC_KEY_SUFFIX)], False
+            elif filename.endswith(PRIVATE_KEY_SUFFIX):
+                kid, is_private = filename[:-len(PRIVATE_KEY_SUFFIX)], True
+            else:
+                continue
+            with open(path) as key_file:
+                key = jwk.construct(key_file.read(), self.algorithm)
+            if is_private:
+                private_keys[kid] = key
+                key = key.public_key()
+            public_keys[kid] = key
+            jwks[kid] = {**key.to_dict(), "kid": kid, "use": "sig"}
+
+        if not private_keys:
+            raise ValueError(f"No JWT private keys found in {self.keys_dir}")
+        active_kid = self.active_kid or sorted(private_keys)[-1]
+        if active_kid not in private_keys:
+            raise ValueError(f"Active JWT key {active_kid} has no private key")
+
+        self._private_keys = private_keys
+        self._public_keys = public_keys
+        self._jwks = jwks
+        self._signing_kid = active_kid
+        # Claims, проверенные удаленными ключами, больше не должны приниматься
+        token_cache.clear()
+
+    def sign(self, claims: dict) -> str:
+        """Подпись claims активным ключом"""
+        with jwt_duration_seconds.time("encode"):
+            return self._sign(claims)
+
+    def _sign(self, claims: dict) -> str:
+        if not self.is_asymmetric:
+            return jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
+        return jwt.encode(
+            claims,
+            self._private_keys[self._signing_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self._signing_kid},
+        )
+
+    def decode(self, token: str) -> dict:
+        """Проверка подписи и декодирование токена (JWTError при ошибке)"""
+        with jwt_duration_seconds.time("decode"):
+            return self._decode(token)
+
+    def _decode(self, token: str) -> dict:
+        if not self.is_asymmetric:
+            return jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._public_keys.get(kid)
+        if key is None:
+            raise JWTError("Unknown key id")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+    def jwks(self) -> dict:
+        """Открытые ключи в формате JWKS"""
+        return {"keys": list(self._jwks.values())}
+
+
+keyring = KeyRing(
+    algorithm=settings.algorithm,
+    secret_key=settings.secret_key,
+    keys_dir=settings.jwt_keys_dir,
+    active_kid=settings.jwt_active_kid,
+)
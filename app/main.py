@@ -1,13 +1,76 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Начало импорта модулей приложения (фаза "imports" в метриках запуска)
+_import_started = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.api import api_router
 from app.config import settings
-from app.database import engine
-from app.models import Base
+from app.database import AsyncSessionLocal, async_engine, get_db, get_pool_status
+from app.hashing import password_hasher
+from app.keys import keyring
+from app.maintenance import scheduler
+from app.metrics import MetricsMiddleware, registry, startup_phase, startup_phase_seconds
+from app.migrations import check_schema
+from app.revocation import revocation_index
+from app.sessions import session_activity
+from app.token_writer import refresh_token_writer
+
+startup_phase_seconds.set(time.perf_counter() - _import_started, "imports")
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Жизненный цикл приложения
+
+    Схема не создается при импорте: каждый воркер только сверяет ревизию БД
+    с alembic head, а миграции применяются один раз до запуска (alembic upgrade head).
+    Фоновые задачи работают через app.state.session_factory (тесты подменяют ее
+    фабрикой тестовой БД).
+    """
+    started = time.perf_counter()
+    session_factory = app.state.session_factory
+    scheduler.session_factory = session_factory
+    refresh_token_writer.session_factory = session_factory
+    session_activity.session_factory = session_factory
+    with startup_phase("schema_check"):
+        await check_schema(async_engine, settings.schema_check)
+    if settings.revocation_index_preload:
+        with startup_phase("revocation_index"):
+            async with session_factory() as db:
+                await revocation_index.load(db)
+    with startup_phase("scheduler"):
+        scheduler.start()
+    refresh_token_writer.start()
+    # Не ждем: процессы пула поднимаются параллельно с приемом запросов
+    password_hasher.warm_up()
+    startup_phase_seconds.set(time.perf_counter() - started, "lifespan")
+    logger.info(
+        "Startup phases: %s",
+        ", ".join(
+            f"{phase}={startup_phase_seconds.value(phase) * 1000:.1f}ms"
+            for phase in ("imports", "schema_check", "revocation_index", "scheduler", "lifespan")
+        ),
+    )
+    yield
+    await scheduler.stop()
+    # Записываем токены, ожидающие групповой фиксации
+    await refresh_token_writer.stop()
+    try:
+        await session_activity.flush()
+    except Exception:
+        logger.exception("Session activity flush on shutdown failed")
+    # Останавливаем пул процессов хеширования паролей
+    password_hasher.shutdown()
 
-# Создание таблиц в базе данных
-Base.metadata.create_all(bind=engine)
 
 # Создание приложения FastAPI
 app = FastAPI(
@@ -15,8 +78,11 @@ app = FastAPI(
     version=settings.app_version,
     description="Сервис авторизации с JWT токенами и PostgreSQL",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
+# Фабрика сессий для задач жизненного цикла: предзагрузка индекса, планировщик, отложенная запись
+app.state.session_factory = AsyncSessionLocal
 
 # Настройка CORS
 app.add_middleware(
@@ -25,8 +91,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Метрики запросов: латентность по шаблону маршрута, запросы в работе, SQL на запрос
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Подключение API роутера
 app.include_router(api_router, prefix="/api/v1")
 
@@ -35,7 +106,8 @@ app.include_router(api_router, prefix="/api/v1")
 async def http_exception_handler(request, exc):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers
     )
 
 # Корневой endpoint
@@ -48,11 +120,37 @@ async def root():
         "redoc": "/redoc"
     }
 
+# Открытые ключи для локальной проверки токенов (шлюзы, другие сервисы)
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    return JSONResponse(
+        content=keyring.jwks(),
+        headers={"Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}"}
+    )
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "auth-service"}
 
+# Метрики в текстовом формате Prometheus
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# Готовность принимать трафик: доступность БД и состояние пула соединений
+@app.get("/health/ready")
+async def readiness_check(db: AsyncSession = Depends(get_db)):
+    try:
+        await db.execute(text("SELECT 1"))
+    except Exception:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "pool": get_pool_status(async_engine)}
+        )
+    return {"status": "ready", "pool": get_pool_status(async_engine)}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import RefreshToken
+from app.sessions import session_activity
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_refresh_tokens(
+    db: AsyncSession,
+    batch_size: int = 1000,
+    max_batches: Optional[int] = None,
+    pause: float = 0.0
+) -> int:
+    """Удаление истекших и отозванных refresh токенов пачками
+
+    Каждая пачка удаляется в отдельной короткой транзакции, поэтому блокировки
+    таблицы не мешают параллельным /refresh. Возвращает число удаленных строк.
+    """
+    now = datetime.utcnow()
+    total = 0
+    batches = 0
+    while True:
+        result = await db.execute(
+            select(RefreshToken.id)
+            .where(or_(RefreshToken.expires_at <= now, RefreshToken.is_revoked == True))
+            .limit(batch_size)
+        )
+        ids = result.scalars().all()
+        if not ids:
+            break
+
+        await db.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+        await db.commit()
+        total += len(ids)
+        batches += 1
+
+        if len(ids) < batch_size or (max_batches is not None and batches >= max_batches):
+            break
+        if pause:
+            await asyncio.sleep(pause)
+    return total
+
+
+class MaintenanceScheduler:
+    """Периодические фоновые задачи внутри процесса приложения"""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        # Фабрика сессий для задач, работающих с БД
+        self.session_factory = session_factory
+        self._jobs: List[tuple] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[None]], interval: float) -> None:
+        """Регистрация задачи, выполняемой раз в interval секунд"""
+        self._jobs.append((name, func, interval))
+
+    def start(self) -> None:
+        """Запуск всех задач"""
+        for name, func, interval in self._jobs:
+            self._tasks.append(asyncio.create_task(self._run(name, func, interval)))
+
+    async def stop(self) -> None:
+        """Остановка всех задач"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, name: str, func: Callable[[], Awaitable[None]], interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Maintenance job %s failed", name)
+
+
+async def purge_refresh_tokens_job() -> None:
+    """Задача планировщика: очистка refresh токенов"""
+    async with scheduler.session_factory() as db:
+        deleted = await purge_refresh_tokens(
+            db,
+            batch_size=settings.token_purge_batch_size,
+            pause=settings.token_purge_batch_pause_ms / 1000
+        )
+    if deleted:
+        logger.info("Purged %d expired or revoked refresh tokens", deleted)
+
+
+async def flush_session_activity_job() -> None:
+    """Задача планировщика: запись времени последнего использования сессий"""
+    await session_activity.flush()
+
+
+scheduler = MaintenanceScheduler()
+scheduler.add_job("flush_session_activity", flush_session_activity_job, settings.session_activity_flush_seconds)
+if settings.token_purge_enabled:
+    scheduler.add_job("purge_refresh_tokens", purge_refresh_tokens_job, settings.token_purge_interval_seconds)
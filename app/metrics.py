@@ -0,0 +1,364 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Границы гистограмм по умолчанию (секунды), как в клиентах Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Метки в формате Prometheus: {name="value",...}"""
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Базовая метрика с метками"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(label) for label in labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels: Tuple[str, ...], value) -> List[str]:
+        return [f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    type_name = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, *labels: str) -> None:
+        """Перенос накопленного значения, которое считает сам объект (статистика кэшей)"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Произвольное значение"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """Гистограмма с накопительными корзинами, суммой и числом наблюдений"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Замер длительности блока"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, *labels: str) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def _render_sample(self, labels: Tuple[str, ...], state) -> List[str]:
+        bucket_counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            bucket_labels = format_labels(self.labelnames, labels, f'le="{format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        plain_labels = format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{plain_labels} {format_value(total)}")
+        lines.append(f"{self.name}_count{plain_labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса с выводом в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors = []
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector) -> None:
+        """Функция, обновляющая метрики перед выводом (например, из статистики кешей)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being processed", ("method",)
+)
+password_hash_duration_seconds = registry.histogram(
+    "password_hash_duration_seconds", "Password hashing and verification time", ("operation",)
+)
+jwt_duration_seconds = registry.histogram(
+    "jwt_duration_seconds", "JWT signing and verification time", ("operation",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+db_queries_total = registry.counter("db_queries_total", "Executed SQL statements")
+db_query_duration_seconds = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50),
+)
+db_time_per_request_seconds = registry.histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request", ("route",)
+)
+cache_hits_total = registry.counter("cache_hits_total", "Cache hits", ("cache",))
+cache_misses_total = registry.counter("cache_misses_total", "Cache misses", ("cache",))
+cache_hit_ratio = registry.gauge("cache_hit_ratio", "Cache hit ratio", ("cache",))
+refresh_token_flush_batch_size = registry.histogram(
+    "refresh_token_flush_batch_size", "Refresh tokens written per group commit",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+refresh_token_flush_seconds = registry.histogram(
+    "refresh_token_flush_seconds", "Refresh token group commit duration"
+)
+startup_phase_seconds = registry.gauge(
+    "app_startup_phase_seconds", "Worker startup phase duration", ("phase",)
+)
+
+# Счетчики SQL текущего запроса: [число запросов, суммарное время]
+request_db_stats: ContextVar[Optional[list]] = ContextVar("request_db_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    db_queries_total.inc()
+    db_query_duration_seconds.observe(elapsed)
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _handle_error(context) -> None:
+    # Упавший запрос не доходит до after_cursor_execute: снимаем его отметку времени
+    # (ошибки вне выполнения запроса, например при подключении, отметки не оставляют)
+    if context.connection is None or context.execution_context is None or context.statement is None:
+        return
+    starts = context.connection.info.get("query_start_time")
+    if starts:
+        starts.pop()
+
+
+@contextmanager
+def startup_phase(name: str) -> Iterator[None]:
+    """Замер фазы запуска воркера"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phase_seconds.set(time.perf_counter() - start, name)
+
+
+def route_template(scope: dict) -> str:
+    """Шаблон маршрута запроса (/users/{user_id}), чтобы id не раздували число серий
+
+    Вложенные роутеры хранят в scope["route"] только свою часть пути, поэтому
+    к ней добавляется префикс роутеров: начальные сегменты фактического пути,
+    не покрытые шаблоном маршрута (в префиксах нет параметров).
+    """
+    route = scope.get("route")
+    if route is None:
+        return "<unmatched>"
+    template = route.path
+    segments = scope["path"].split("/")
+    prefix = "/".join(segments[:len(segments) - template.count("/")])
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """ASGI middleware метрик запросов: латентность по шаблону маршрута, запросы в работе, SQL на запрос
+
+    Обычный ASGI-класс, а не BaseHTTPMiddleware: без отдельной задачи и обертки
+    потока ответа на каждый запрос; статус берется из http.response.start.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        db_stats = [0, 0.0]
+        token = request_db_stats.set(db_stats)
+        http_requests_in_progress.inc(method)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec(method)
+            request_db_stats.reset(token)
+            route_path = route_template(scope)
+            http_requests_total.inc(method, route_path, str(status_code))
+            http_request_duration_seconds.observe(elapsed, method, route_path)
+            db_queries_per_request.observe(db_stats[0], route_path)
+            db_time_per_request_seconds.observe(db_stats[1], route_path)
+
+
+def instrument_engine(engine) -> None:
+    """Подключение замеров SQL к движку (для AsyncEngine - к его sync_engine)"""
+    # Импорт здесь: модуль загружается и в процессах пула хеширования, где SQLAlchemy не нужна
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def register_cache(name: str, cache) -> None:
+    """Экспорт статистики TTLCache в метрики"""
+    def collect():
+        stats = cache.stats()
+        cache_hits_total.set_total(stats["hits"], name)
+        cache_misses_total.set_total(stats["misses"], name)
+        cache_hit_ratio.set(stats["hit_ratio"], name)
+    registry.add_collector(collect)
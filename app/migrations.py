@@ -0,0 +1,58 @@
+import logging
+import os
+from typing import Set
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(PROJECT_DIR, "alembic.ini")
+
+SCHEMA_CHECK_MODES = ("error", "warn", "skip")
+
+
+class SchemaMismatchError(RuntimeError):
+    """Ревизия схемы БД не совпадает с последней миграцией"""
+
+
+def get_head_revisions() -> Set[str]:
+    """Последние ревизии миграций из alembic/versions (без подключения к БД)"""
+    # alembic нужен только здесь: не загружаем его при импорте приложения
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(PROJECT_DIR, "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def get_current_revisions(connection) -> Set[str]:
+    """Ревизии, записанные в alembic_version"""
+    from alembic.runtime.migration import MigrationContext
+
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+async def check_schema(engine: AsyncEngine, mode: str = "error") -> None:
+    """Сверка схемы БД с последней миграцией вместо create_all при старте
+
+    Одна читающая проверка на воркер: схему меняет только alembic upgrade head,
+    поэтому воркеры не соревнуются за создание таблиц.
+    """
+    if mode == "skip":
+        return
+    if mode not in SCHEMA_CHECK_MODES:
+        raise ValueError(f"Unsupported schema check mode: {mode}")
+    async with engine.connect() as connection:
+        current = await connection.run_sync(get_current_revisions)
+    head = get_head_revisions()
+    if current == head:
+        return
+    message = (
+        f"Database schema revision {', '.join(sorted(current)) or 'none'} does not match "
+        f"migrations head {', '.join(sorted(head))}; run 'alembic upgrade head'"
+    )
+    if mode == "warn":
+        logger.warning(message)
+        return
+    raise SchemaMismatchError(message)
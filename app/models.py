@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -14,6 +14,8 @@ class User(Base):
     is_superuser = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Все refresh токены, выданные до этого момента, недействительны ("выход везде")
+    tokens_revoked_before = Column(DateTime(timezone=True), nullable=True)
 
 
 class RefreshToken(Base):
@@ -21,7 +23,17 @@ class RefreshToken(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
-    token = Column(Text, unique=True, nullable=False)
+    # SHA-256 от токена в hex: сам токен в базе не хранится
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     is_revoked = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Последнее использование (пишется пачками, может отставать на интервал сброса)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+    # Устройство, на котором выдана сессия
+    user_agent = Column(String(255), nullable=True)
+    ip_address = Column(String(45), nullable=True)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id_is_revoked_expires_at", "user_id", "is_revoked", "expires_at"),
+    )
@@ -0,0 +1,130 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from app.config import settings
+
+
+class RateLimitBackend(ABC):
+    """Хранилище счетчиков скользящего окна
+
+    Локальная реализация - MemoryRateLimitBackend. Для общих счетчиков между
+    воркерами достаточно реализовать hit/reset поверх внешнего хранилища
+    (например, Redis sorted set) и передать его в LoginRateLimiter.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        """Регистрация попытки (limit > 0); при превышении лимита - секунды до освобождения окна"""
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """Сброс счетчика ключа"""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Сброс всех счетчиков"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Счетчики в памяти процесса
+
+    Для каждого ключа хранится не больше limit последних попыток, число
+    ключей ограничено max_keys с вытеснением давно не использованных.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        if limit <= 0:
+            raise ValueError("Rate limit must be positive")
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._windows.get(key)
+            if attempts is None:
+                attempts = self._windows[key] = deque(maxlen=limit)
+            self._windows.move_to_end(key)
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            if len(attempts) >= limit:
+                return attempts[0] + window - now
+            attempts.append(now)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+            return None
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        return self._hit(key, limit, window)
+
+    async def reset(self, key: str) -> None:
+        with self._lock:
+            self._windows.pop(key, None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+
+class LoginRateLimiter:
+    """Ограничение попыток входа по username и IP клиента
+
+    Проверка выполняется до проверки пароля, поэтому перебор не тратит CPU на bcrypt.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        per_username: int,
+        per_ip: int,
+        window: float,
+        enabled: bool = True
+    ):
+        if per_username <= 0 or per_ip <= 0 or window <= 0:
+            raise ValueError("Rate limits and window must be positive")
+        self.backend = backend
+        self.per_username = per_username
+        self.per_ip = per_ip
+        self.window = window
+        self.enabled = enabled
+
+    async def check(self, username: str, ip: Optional[str]) -> Optional[float]:
+        """Регистрация попытки входа; секунды до следующей разрешенной попытки или None"""
+        if not self.enabled:
+            return None
+        if ip:
+            retry_after = await self.backend.hit(f"ip:{ip}", self.per_ip, self.window)
+            if retry_after is not None:
+                return retry_after
+        return await self.backend.hit(f"user:{username.lower()}", self.per_username, self.window)
+
+    async def reset(self, username: str) -> None:
+        """Сброс счетчика пользователя после успешного входа"""
+        if self.enabled:
+            await self.backend.reset(f"user:{username.lower()}")
+
+
+async def enforce_login_rate_limit(request: Request, username: str) -> None:
+    """Ответ 429 с Retry-After при превышении лимита попыток входа"""
+    ip = request.client.host if request.client else None
+    retry_after = await login_rate_limiter.check(username, ip)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+
+
+login_rate_limiter = LoginRateLimiter(
+    backend=MemoryRateLimitBackend(max_keys=settings.login_rate_limit_max_keys),
+    per_username=settings.login_rate_limit_per_username,
+    per_ip=settings.login_rate_limit_per_ip,
+    window=settings.login_rate_limit_window_seconds,
+    enabled=settings.login_rate_limit_enabled,
+)
@@ -0,0 +1,95 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import RefreshToken, User
+
+logger = logging.getLogger(__name__)
+
+
+def as_naive_utc(value: datetime) -> datetime:
+    """Приведение времени к naive UTC (SQLite и PostgreSQL возвращают разные типы)"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class RevocationIndex:
+    """In-memory индекс отзыва refresh токенов
+
+    Ограниченное LRU-множество недавно отозванных digest: токен из него
+    отклоняется без запроса к БД, вытесненный или неизвестный проверяется по БД,
+    которая остается источником истины для всех воркеров. Для "выхода везде"
+    хранится время отзыва всех сессий пользователя.
+    """
+
+    def __init__(self, recent_size: int):
+        self.recent_size = recent_size
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._revoked_before: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, token_hash: str) -> None:
+        """Регистрация отозванного токена"""
+        with self._lock:
+            self._recent[token_hash] = None
+            self._recent.move_to_end(token_hash)
+            while len(self._recent) > self.recent_size:
+                self._recent.popitem(last=False)
+
+    def revoke_user(self, user_id: int, before: datetime) -> None:
+        """Регистрация отзыва всех сессий пользователя, выданных до before"""
+        before = as_naive_utc(before)
+        with self._lock:
+            current = self._revoked_before.get(user_id)
+            if current is None or before > current:
+                self._revoked_before[user_id] = before
+
+    def is_revoked(self, token_hash: str) -> bool:
+        """Токен точно отозван (False означает "неизвестно, спросить БД")"""
+        return token_hash in self._recent
+
+    def revoked_before(self, user_id: int) -> Optional[datetime]:
+        """Время последнего отзыва всех сессий пользователя"""
+        return self._revoked_before.get(user_id)
+
+    def is_session_revoked(self, user_id: int, created_at: Optional[datetime]) -> bool:
+        """Сессия выдана до отзыва всех сессий пользователя"""
+        revoked_before = self._revoked_before.get(user_id)
+        if revoked_before is None or created_at is None:
+            return False
+        return as_naive_utc(created_at) <= revoked_before
+
+    def clear(self) -> None:
+        """Сброс индекса"""
+        with self._lock:
+            self._recent.clear()
+            self._revoked_before.clear()
+
+    async def load(self, db: AsyncSession) -> None:
+        """Начальная загрузка: последние recent_size отозванных, но еще не истекших токенов"""
+        result = await db.execute(
+            select(RefreshToken.token_hash)
+            .where(RefreshToken.is_revoked == True, RefreshToken.expires_at > datetime.utcnow())
+            .order_by(RefreshToken.id.desc())
+            .limit(self.recent_size)
+        )
+        # Старые первыми, чтобы при вытеснении уходили они
+        for token_hash in reversed(result.scalars().all()):
+            self.revoke(token_hash)
+
+        result = await db.execute(
+            select(User.id, User.tokens_revoked_before).where(User.tokens_revoked_before.is_not(None))
+        )
+        for user_id, revoked_before in result:
+            self.revoke_user(user_id, revoked_before)
+        logger.info(
+            "Revocation index loaded: %d tokens, %d users", len(self._recent), len(self._revoked_before)
+        )
+
+
+revocation_index = RevocationIndex(recent_size=settings.revocation_recent_size)
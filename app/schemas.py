@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -33,12 +33,41 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     expires_in: int
+    refresh_token: Optional[str] = None
+
+
+class Session(BaseModel):
+    id: int
+    created_at: datetime
+    expires_at: datetime
+    last_used_at: Optional[datetime] = None
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 
 class TokenData(BaseModel):
     username: Optional[str] = None
 
 
+class IntrospectionRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1)
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    sub: Optional[str] = None
+    exp: Optional[int] = None
+    claims: Optional[dict] = None
+    user: Optional[User] = None
+
+
+class IntrospectionResponse(BaseModel):
+    results: List[TokenIntrospection]
+
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -55,3 +84,33 @@ class PasswordResetRequest(BaseModel):
 class PasswordResetConfirm(BaseModel):
     token: str
     new_password: str
+
+
+class UserImportRecord(BaseModel):
+    email: EmailStr
+    username: str
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    is_active: bool = True
+    is_superuser: bool = False
+
+    @model_validator(mode="after")
+    def check_password(self):
+        """Ровно одно из полей password / hashed_password"""
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("Exactly one of password or hashed_password is required")
+        return self
+
+
+class UserImportError(BaseModel):
+    line: int
+    error: str
+
+
+class UserImportReport(BaseModel):
+    total: int
+    created: int
+    failed: int
+    errors: List[UserImportError]
+    elapsed_seconds: float
+    rows_per_second: float
@@ -0,0 +1,73 @@
+import hashlib
+from typing import Iterable, List, Optional, Type, TypeVar
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from app import schemas
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Сериализаторы схем горячих endpoints, собираются один раз при импорте
+user_adapter = TypeAdapter(schemas.User)
+user_list_adapter = TypeAdapter(List[schemas.User])
+token_adapter = TypeAdapter(schemas.Token)
+
+# Данные пользователя: только в кеше клиента и с обязательной перепроверкой по ETag
+USER_CACHE_CONTROL = "private, no-cache"
+
+
+class TrustedJSONResponse(Response):
+    """Ответ с уже сериализованным JSON: FastAPI не валидирует и не кодирует его повторно"""
+
+    media_type = "application/json"
+
+
+def construct_from_attributes(model: Type[ModelT], obj) -> ModelT:
+    """Схема из ORM объекта без валидации (данные из БД уже проверены при записи)"""
+    return model.model_construct(**{name: getattr(obj, name) for name in model.model_fields})
+
+
+def user_etag(user) -> str:
+    """Сильный ETag пользователя (схема User или ORM объект) без сериализации ответа
+
+    Основа - id и updated_at; остальные поля схемы тоже входят в отпечаток, т.к.
+    updated_at в SQLite хранится с точностью до секунды.
+    """
+    stamp = repr(tuple(getattr(user, name) for name in schemas.User.model_fields))
+    return '"' + hashlib.sha256(stamp.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадение ETag с заголовком If-None-Match (слабое сравнение, как требует RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified_response(etag: str) -> Response:
+    """Ответ 304 без тела"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": USER_CACHE_CONTROL})
+
+
+def user_response(user, etag: Optional[str] = None) -> TrustedJSONResponse:
+    """Ответ с пользователем (схема User или ORM объект), с ETag при заданном etag"""
+    if not isinstance(user, schemas.User):
+        user = construct_from_attributes(schemas.User, user)
+    response = TrustedJSONResponse(user_adapter.dump_json(user))
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = USER_CACHE_CONTROL
+    return response
+
+
+def users_response(users: Iterable) -> TrustedJSONResponse:
+    """Ответ со списком пользователей из ORM объектов"""
+    return TrustedJSONResponse(
+        user_list_adapter.dump_json([construct_from_attributes(schemas.User, user) for user in users])
+    )
+
+
+def token_response(**fields) -> TrustedJSONResponse:
+    """Ответ с токенами"""
+    return TrustedJSONResponse(token_adapter.dump_json(schemas.Token.model_construct(**fields)))
@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.models import RefreshToken, User
+from app.revocation import revocation_index
+from app.schemas import Session
+from app.token_writer import refresh_token_writer
+
+USER_AGENT_MAX_LENGTH = 255
+
+
+def device_metadata(request: Request) -> Dict[str, Optional[str]]:
+    """Данные устройства для новой сессии: User-Agent и IP клиента"""
+    user_agent = request.headers.get("user-agent")
+    return {
+        "user_agent": user_agent[:USER_AGENT_MAX_LENGTH] if user_agent else None,
+        "ip_address": request.client.host if request.client else None,
+    }
+
+
+class SessionActivity:
+    """Буфер времени последнего использования refresh сессий
+
+    /refresh только запоминает время в памяти процесса: повторные обращения к
+    одной сессии схлопываются в одну отметку, а flush пишет все накопленные
+    одним executemany UPDATE. В БД last_used_at отстает не больше чем на
+    интервал сброса; список сессий дополняется отметками из буфера.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._pending: Dict[str, datetime] = {}
+
+    def touch(self, token_hash: str, when: datetime) -> None:
+        """Отметка использования сессии"""
+        self._pending[token_hash] = when
+
+    def last_used(self, token_hash: str) -> Optional[datetime]:
+        """Еще не записанная отметка использования"""
+        return self._pending.get(token_hash)
+
+    def clear(self) -> None:
+        self._pending.clear()
+
+    async def flush(self) -> int:
+        """Запись накопленных отметок одной транзакцией"""
+        if not self._pending:
+            return 0
+        # Отметки, появившиеся во время записи, попадут в следующую пачку
+        pending, self._pending = self._pending, {}
+        table = RefreshToken.__table__
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(table)
+                    .where(table.c.token_hash == bindparam("b_token_hash"))
+                    .values(last_used_at=bindparam("b_last_used_at")),
+                    [
+                        {"b_token_hash": token_hash, "b_last_used_at": when}
+                        for token_hash, when in pending.items()
+                    ],
+                )
+                await db.commit()
+        except Exception:
+            # Возвращаем в буфер, не затирая более свежие отметки
+            for token_hash, when in pending.items():
+                self._pending.setdefault(token_hash, when)
+            raise
+        return len(pending)
+
+
+async def list_sessions(db: AsyncSession, user_id: int) -> List[Session]:
+    """Действующие refresh сессии пользователя, новые первыми
+
+    Поиск идет по индексу (user_id, is_revoked, expires_at); сессии, выданные
+    до "выхода везде", отсекаются по users.tokens_revoked_before в том же запросе.
+    Читается основная БД, чтобы только что отозванная сессия не попала в список.
+    """
+    if refresh_token_writer.running:
+        await refresh_token_writer.flush()
+    result = await db.execute(
+        select(RefreshToken)
+        .join(User, User.id == RefreshToken.user_id)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.utcnow(),
+            or_(User.tokens_revoked_before.is_(None), RefreshToken.created_at > User.tokens_revoked_before),
+        )
+        .order_by(RefreshToken.created_at.desc(), RefreshToken.id.desc())
+        .execution_options(use_primary=True)
+    )
+    sessions = []
+    for db_token in result.scalars().all():
+        session = Session.model_validate(db_token)
+        last_used = session_activity.last_used(db_token.token_hash)
+        if last_used is not None:
+            session.last_used_at = last_used
+        sessions.append(session)
+    return sessions
+
+
+async def revoke_session(db: AsyncSession, user_id: int, session_id: int) -> bool:
+    """Отзыв одной сессии пользователя одним UPDATE (False, если сессии нет или она уже отозвана)"""
+    criteria = (
+        RefreshToken.id == session_id,
+        RefreshToken.user_id == user_id,
+        RefreshToken.is_revoked == False,
+    )
+    revoke = (
+        update(RefreshToken)
+        .where(*criteria)
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        token_hash = (await db.execute(revoke.returning(RefreshToken.token_hash))).scalar()
+    else:
+        token_hash = (await db.execute(
+            select(RefreshToken.token_hash).where(*criteria).execution_options(use_primary=True)
+        )).scalar()
+        if token_hash is not None:
+            await db.execute(revoke)
+    await db.commit()
+    if token_hash is None:
+        return False
+    revocation_index.revoke(token_hash)
+    return True
+
+
+session_activity = SessionActivity()
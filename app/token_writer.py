@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.metrics import refresh_token_flush_batch_size, refresh_token_flush_seconds
+from app.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenWriter:
+    """Отложенная запись refresh токенов с групповой фиксацией
+
+    Токены копятся в очереди процесса и вставляются одним executemany в одной
+    транзакции, когда набирается max_batch строк или проходит max_delay секунд
+    с первой строки пачки. Число транзакций (и fsync) растет с числом пачек,
+    а не входов.
+
+    Гарантии: токен выдается клиенту до фиксации в БД и теряется, если процесс
+    аварийно завершится в пределах max_delay; при штатной остановке очередь
+    сбрасывается. Токен из очереди этого процесса сбрасывается в БД перед
+    проверкой, отзывом или ротацией (ensure_flushed), поэтому /refresh его видит.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, max_batch: int = 500, max_delay: float = 0.005,
+                 enabled: bool = False):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enabled = enabled
+        self._pending: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Запуск фоновой записи (в цикле событий приложения)"""
+        if not self.enabled or self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка с записью всех ожидающих токенов"""
+        if not self.running:
+            return
+        # Под блокировкой: фоновая пачка не прерывается посреди записи
+        async with self._lock:
+            self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Refresh token flush on shutdown failed, %d tokens lost", len(self._pending))
+
+    def enqueue(self, row: dict) -> None:
+        """Постановка строки refresh_tokens в очередь записи"""
+        self._pending[row["token_hash"]] = row
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+
+    async def ensure_flushed(self, token_hash: str) -> None:
+        """Запись токена в БД, если он еще в очереди"""
+        if token_hash in self._pending:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Запись всех ожидающих токенов одной транзакцией"""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            rows: List[dict] = list(self._pending.values())
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            async with self.session_factory() as db:
+                await db.execute(insert(RefreshToken), rows)
+                await db.commit()
+            # Пока шла запись, токены могли добавиться: удаляем только записанные
+            for row in rows:
+                if self._pending.get(row["token_hash"]) is row:
+                    del self._pending[row["token_hash"]]
+            refresh_token_flush_batch_size.observe(len(rows))
+            refresh_token_flush_seconds.observe(loop.time() - start)
+            return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # Ждем заполнения пачки, но не дольше max_delay
+            try:
+                await asyncio.wait_for(self._full.wait(), self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._full.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Строки остаются в очереди и будут записаны следующей пачкой
+                logger.exception("Refresh token flush failed, %d tokens pending", len(self._pending))
+                self._wakeup.set()
+                await asyncio.sleep(max(self.max_delay, 0.1))
+
+
+refresh_token_writer = RefreshTokenWriter(
+    max_batch=settings.refresh_token_flush_size,
+    max_delay=settings.refresh_token_flush_delay_ms / 1000,
+    enabled=settings.refresh_token_write_behind,
+)
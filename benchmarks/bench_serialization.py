@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации ответов /me и GET /users/: стандартный путь FastAPI
+(валидация from_attributes + JSON) против готовых TypeAdapter без повторной валидации
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from app import schemas
+from app.models import User
+from app.serializers import user_adapter, user_list_adapter, user_response, users_response
+
+
+def make_users(count: int):
+    return [
+        User(
+            id=index,
+            email=f"user{index}@example.com",
+            username=f"user{index}",
+            hashed_password="x",
+            is_active=True,
+            is_superuser=False,
+            created_at=datetime(2024, 1, 1),
+            updated_at=None,
+        )
+        for index in range(count)
+    ]
+
+
+def respond(content) -> Response:
+    return Response(content, media_type="application/json")
+
+
+def measure(func, seconds: float) -> float:
+    """Число вызовов в секунду"""
+    func()
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        func()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=1.0, help="длительность каждого замера")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 100, 1000], help="размеры списка")
+    args = parser.parse_args()
+
+    principal = schemas.User.model_validate(make_users(1)[0])
+    variants = {
+        "/me stdlib json": lambda: respond(json.dumps(jsonable_encoder(user_adapter.validate_python(principal)))),
+        "/me fastapi": lambda: respond(user_adapter.dump_json(user_adapter.validate_python(principal))),
+        "/me trusted": lambda: user_response(principal),
+    }
+    for name, func in variants.items():
+        print(f"{name:<28} {measure(func, args.seconds):>12.0f} ops/s")
+
+    for size in args.sizes:
+        users = make_users(size)
+        variants = {
+            f"/users/ x{size} stdlib json": lambda: respond(json.dumps(
+                jsonable_encoder(user_list_adapter.validate_python(users, from_attributes=True))
+            )),
+            f"/users/ x{size} fastapi": lambda: respond(user_list_adapter.dump_json(
+                user_list_adapter.validate_python(users, from_attributes=True)
+            )),
+            f"/users/ x{size} trusted": lambda: users_response(users),
+        }
+        results = {name: measure(func, args.seconds) for name, func in variants.items()}
+        baseline = results[f"/users/ x{size} fastapi"]
+        for name, ops in results.items():
+            print(f"{name:<28} {ops:>12.0f} ops/s ({ops / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
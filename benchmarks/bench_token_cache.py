@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк влияния кеша проверенных токенов на пропускную способность /api/v1/auth/me
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tempdb import create_schema, use_temp_database
+
+# Всегда отдельная временная база, даже если DATABASE_URL задан в окружении
+use_temp_database(prefix="auth-bench-")
+
+from fastapi.testclient import TestClient
+from app.cache import principal_cache, token_cache
+from app.main import app
+
+
+def measure(client: TestClient, headers: dict, requests: int) -> float:
+    """Количество запросов /me в секунду"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get("/api/v1/auth/me", headers=headers)
+        assert response.status_code == 200, response.text
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000, help="число запросов в каждом прогоне")
+    args = parser.parse_args()
+
+    create_schema()
+    token_cache_size = token_cache.maxsize
+    with TestClient(app) as client:
+        client.post(
+            "/api/v1/auth/register",
+            json={"email": "bench@example.com", "username": "bench", "password": "benchpassword"}
+        )
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"username": "bench", "password": "benchpassword"}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        # Прогрев
+        measure(client, headers, 100)
+
+        token_cache.maxsize = 0
+        token_cache.clear()
+        without_cache = measure(client, headers, args.requests)
+
+        token_cache.maxsize = token_cache_size
+        token_cache.clear()
+        with_cache = measure(client, headers, args.requests)
+
+    print(f"Кеш принципалов: {principal_cache.stats()}")
+    print(f"Без кеша токенов: {without_cache:.0f} req/s")
+    print(f"С кешем токенов:  {with_cache:.0f} req/s ({with_cache / without_cache:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
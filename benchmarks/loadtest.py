@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест основных сценариев авторизации
+
+Запуск против приложения в процессе (httpx + ASGI) или под uvicorn на засеянной
+временной базе SQLite. Смесь запросов: регистрация, вход, обновление токена, /me
+и список пользователей администратором. Результат: p50/p95/p99 и req/s по каждому
+endpoint, сохраняется в JSON; режим compare сравнивает с сохраненным baseline.
+
+    python benchmarks/loadtest.py run --duration 30 --concurrency 20 --output current.json
+    python benchmarks/loadtest.py run --mode uvicorn --baseline baseline.json
+    python benchmarks/loadtest.py compare baseline.json current.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from tempdb import create_schema, temp_engine, use_temp_database
+
+# Смесь запросов по умолчанию (относительные веса)
+DEFAULT_MIX = {"me": 60, "refresh": 15, "login": 10, "register": 5, "admin_list": 10}
+
+SEED_PASSWORD = "loadtestpassword"
+ADMIN_USERNAME = "loadadmin"
+ADMIN_PASSWORD = "loadadminpassword"
+
+
+def configure_environment() -> Dict[str, str]:
+    """Настройки приложения для прогона: всегда временная база, без лимита попыток входа"""
+    use_temp_database(prefix="auth-load-", filename="load.db")
+    # Все виртуальные пользователи приходят с одного IP
+    os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+    return {key: os.environ[key] for key in ("DATABASE_URL", "SCHEMA_CHECK", "LOGIN_RATE_LIMIT_ENABLED")}
+
+
+def seed_database(users: int) -> None:
+    """Создание схемы, администратора и users обычных пользователей с общим хешем пароля"""
+    from sqlalchemy import insert
+    from app.hashing import get_password_hash
+    from app.models import User
+
+    create_schema()
+    engine = temp_engine()
+    hashed_password = get_password_hash(SEED_PASSWORD)
+    rows = [
+        {
+            "email": f"load{index}@example.com",
+            "username": f"load{index}",
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_superuser": False,
+        }
+        for index in range(users)
+    ]
+    rows.append({
+        "email": "loadadmin@example.com",
+        "username": ADMIN_USERNAME,
+        "hashed_password": get_password_hash(ADMIN_PASSWORD),
+        "is_active": True,
+        "is_superuser": True,
+    })
+    with engine.begin() as connection:
+        connection.execute(insert(User), rows)
+    engine.dispose()
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> dict:
+    """Сводка по endpoint: число запросов, ошибки, req/s и перцентили в миллисекундах"""
+    endpoints = {}
+    for name in sorted(set(latencies) | set(errors)):
+        values = latencies.get(name, [])
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "total_requests": total,
+        "total_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Регрессии: рост p95/p99 или падение req/s больше threshold (доля) по любому endpoint"""
+    regressions = []
+    for name, base in baseline["endpoints"].items():
+        cur = current["endpoints"].get(name)
+        if cur is None:
+            regressions.append(f"{name}: отсутствует в текущем прогоне")
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if base[metric] and cur[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {metric} {base[metric]:.1f} -> {cur[metric]:.1f} "
+                    f"(+{(cur[metric] / base[metric] - 1) * 100:.0f}%)"
+                )
+        if base["rps"] and cur["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: rps {base['rps']:.1f} -> {cur['rps']:.1f} "
+                f"(-{(1 - cur['rps'] / base['rps']) * 100:.0f}%)"
+            )
+        if cur["errors"] > base["errors"]:
+            regressions.append(f"{name}: ошибок {base['errors']} -> {cur['errors']}")
+    return regressions
+
+
+class VirtualUser:
+    """Виртуальный пользователь: выполняет случайные запросы из смеси"""
+
+    def __init__(self, index: int, client, mix: Dict[str, int], admin_headers: dict,
+                 seed_users: int, rng: random.Random):
+        self.index = index
+        self.client = client
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.admin_headers = admin_headers
+        self.username = f"load{index % seed_users}"
+        self.rng = rng
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.registered = 0
+
+    async def login(self):
+        response = await self.client.post(
+            "/api/v1/auth/login", json={"username": self.username, "password": SEED_PASSWORD}
+        )
+        if response.status_code == 200:
+            data = response.json()
+            self.access_token = data["access_token"]
+            self.refresh_token = data["refresh_token"]
+        return response
+
+    async def me(self):
+        return await self.client.get(
+            "/api/v1/auth/me", headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+
+    async def refresh(self):
+        response = await self.client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": self.refresh_token}
+        )
+        if response.status_code == 200:
+            data = response.json()
+            self.access_token = data["access_token"]
+            self.refresh_token = data.get("refresh_token") or self.refresh_token
+        return response
+
+    async def register(self):
+        self.registered += 1
+        suffix = f"{self.index}x{self.registered}x{os.getpid()}x{time.time_ns() % 1000000}"
+        return await self.client.post(
+            "/api/v1/auth/register",
+            json={"email": f"new{suffix}@example.com", "username": f"new{suffix}", "password": SEED_PASSWORD},
+        )
+
+    async def admin_list(self):
+        return await self.client.get("/api/v1/users/", params={"limit": 50}, headers=self.admin_headers)
+
+    async def run(self, deadline: float, latencies: Dict[str, List[float]], errors: Dict[str, int]):
+        await self.login()
+        while time.perf_counter() < deadline:
+            name = self.rng.choices(self.names, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await getattr(self, name)()
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if ok:
+                latencies.setdefault(name, []).append(elapsed)
+            else:
+                errors[name] = errors.get(name, 0) + 1
+
+
+async def drive(client, args, mix: Dict[str, int]) -> dict:
+    """Прогрев и замер с заданной конкурентностью"""
+    response = await client.post(
+        "/api/v1/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}
+    )
+    response.raise_for_status()
+    admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def make_users(seed: int):
+        return [
+            VirtualUser(index, client, mix, admin_headers, args.users, random.Random(seed + index))
+            for index in range(args.concurrency)
+        ]
+
+    if args.warmup:
+        deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(*(user.run(deadline, {}, {}) for user in make_users(args.seed + 100000)))
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(user.run(deadline, latencies, errors) for user in make_users(args.seed)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_inprocess(args, mix: Dict[str, int]) -> dict:
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return await drive(client, args, mix)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_http(args, mix: Dict[str, int], base_url: str) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        for _ in range(100):
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError(f"Сервер {base_url} не отвечает")
+        return await drive(client, args, mix)
+
+
+def run(args) -> int:
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            print(f"❌ Неизвестный сценарий: {name}")
+            return 2
+        mix[name] = int(weight)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+
+    env = configure_environment()
+    print(f"🌱 Засеивание базы: {args.users} пользователей ({env['DATABASE_URL']})")
+    seed_database(args.users)
+
+    server = None
+    try:
+        if args.mode == "uvicorn":
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+                cwd=ROOT_DIR,
+                env={**os.environ, **env},
+            )
+            summary = asyncio.run(run_http(args, mix, f"http://127.0.0.1:{port}"))
+        else:
+            summary = asyncio.run(run_inprocess(args, mix))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result = {
+        "meta": {
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else None,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed_users": args.users,
+            "mix": mix,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        **summary,
+    }
+    print_summary(result)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2, ensure_ascii=False)
+        print(f"✅ Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            return report_comparison(json.load(baseline_file), result, args.threshold)
+    return 0
+
+
+def print_summary(result: dict) -> None:
+    print(f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in result["endpoints"].items():
+        print(
+            f"{name:<12} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+    print(f"Всего: {result['total_requests']} запросов, {result['total_rps']:.1f} req/s")
+
+
+def report_comparison(baseline: dict, current: dict, threshold: float) -> int:
+    regressions = compare_results(baseline, current, threshold)
+    if regressions:
+        print(f"❌ Регрессии относительно baseline (порог {threshold:.0%}):")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print(f"✅ Регрессий относительно baseline нет (порог {threshold:.0%})")
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        return report_comparison(json.load(baseline_file), json.load(current_file), args.threshold)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса авторизации")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="выполнить прогон")
+    run_parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess",
+                            help="приложение в процессе (ASGI) или под uvicorn")
+    run_parser.add_argument("--workers", type=int, default=1, help="число воркеров uvicorn")
+    run_parser.add_argument("--concurrency", type=int, default=20, help="число виртуальных пользователей")
+    run_parser.add_argument("--duration", type=float, default=30, help="длительность замера в секундах")
+    run_parser.add_argument("--warmup", type=float, default=3, help="длительность прогрева в секундах")
+    run_parser.add_argument("--users", type=int, default=1000, help="число засеянных пользователей")
+    run_parser.add_argument("--seed", type=int, default=42, help="seed генератора сценариев")
+    run_parser.add_argument("--mix", nargs="*", metavar="NAME=WEIGHT",
+                            help=f"веса сценариев (по умолчанию {DEFAULT_MIX})")
+    run_parser.add_argument("--output", help="файл для сохранения результатов в JSON")
+    run_parser.add_argument("--baseline", help="сравнить результат с baseline JSON")
+    run_parser.add_argument("--threshold", type=float, default=0.15, help="допустимое ухудшение (доля)")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="сравнить два сохраненных прогона")
+    compare_parser.add_argument("baseline", help="baseline JSON")
+    compare_parser.add_argument("current", help="текущий JSON")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="допустимое ухудшение (доля)")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
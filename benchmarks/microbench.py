@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки примитивов app.auth
+
+Наборы:
+  jwt       - create_access_token и проверка подписи по алгоритмам и размерам ключей
+  password  - get_password_hash и verify_password по схемам и стоимости хеширования
+  refresh   - create_refresh_token и verify_refresh_token по размеру таблицы refresh_tokens
+
+Для каждой операции: прогрев, repeat замеров по number вызовов, min/median/mean/
+stdev/p95 и ops/s. Результат выводится таблицей и сохраняется в JSON вместе с
+версиями зависимостей, чтобы сравнивать прогоны после обновлений.
+
+    python benchmarks/microbench.py --suite jwt password --json microbench.json
+    python benchmarks/microbench.py --suite refresh --table-sizes 1000 100000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from importlib import metadata
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tempdb import check_temp_database, use_temp_database
+
+# Набор refresh очищает refresh_tokens: всегда временная база, даже если DATABASE_URL задан
+DB_DIR = use_temp_database(prefix="auth-microbench-", filename="microbench.db")
+
+DEPENDENCIES = ("python-jose", "cryptography", "passlib", "bcrypt", "argon2-cffi", "sqlalchemy", "aiosqlite")
+
+
+def summarize(timings: List[float], number: int) -> dict:
+    """Статистика по замерам (время одного вызова в микросекундах)"""
+    per_call = sorted(timing / number * 1e6 for timing in timings)
+    p95_index = min(int(round(0.95 * len(per_call) + 0.5)) - 1, len(per_call) - 1)
+    median = statistics.median(per_call)
+    return {
+        "repeat": len(per_call),
+        "number": number,
+        "min_us": round(per_call[0], 3),
+        "median_us": round(median, 3),
+        "mean_us": round(statistics.fmean(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+        "p95_us": round(per_call[max(p95_index, 0)], 3),
+        "ops_per_second": round(1e6 / median, 1) if median else 0.0,
+    }
+
+
+def bench(func: Callable[[], object], warmup: int, repeat: int, number: int) -> dict:
+    """Замер синхронной функции"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, number)
+
+
+async def bench_async(func: Callable[[], Awaitable[object]], warmup: int, repeat: int, number: int) -> dict:
+    """Замер корутины"""
+    for _ in range(warmup):
+        await func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, number)
+
+
+def jwt_variants(algorithms: List[str], rsa_sizes: List[int]):
+    """Наборы ключей (метка, KeyRing) для перечисленных алгоритмов"""
+    from app.config import settings
+    from app.keys import PRIVATE_KEY_SUFFIX, KeyRing, generate_private_key_pem
+
+    for algorithm in algorithms:
+        if algorithm.startswith("HS"):
+            yield {"algorithm": algorithm}, KeyRing(algorithm, settings.secret_key)
+            continue
+        sizes = rsa_sizes if algorithm.startswith("RS") else [None]
+        for size in sizes:
+            keys_dir = tempfile.mkdtemp(prefix="auth-microbench-keys-", dir=DB_DIR)
+            with open(os.path.join(keys_dir, "bench" + PRIVATE_KEY_SUFFIX), "w") as key_file:
+                key_file.write(generate_private_key_pem(algorithm, size or 2048))
+            params = {"algorithm": algorithm}
+            if size:
+                params["key_size"] = size
+            yield params, KeyRing(algorithm, settings.secret_key, keys_dir=keys_dir)
+
+
+def run_jwt(args) -> List[dict]:
+    import app.auth
+
+    results = []
+    original_keyring = app.auth.keyring
+    try:
+        for params, keyring in jwt_variants(args.algorithms, args.rsa_sizes):
+            # create_access_token подписывает ключами модуля app.auth
+            app.auth.keyring = keyring
+            token = app.auth.create_access_token({"sub": "bench"})
+            results.append(result("jwt", "create_access_token", params, bench(
+                lambda: app.auth.create_access_token({"sub": "bench"}),
+                args.warmup, args.repeat, args.number,
+            )))
+            # Проверка подписи без кеша токенов
+            results.append(result("jwt", "jwt.decode", params, bench(
+                lambda: keyring.decode(token), args.warmup, args.repeat, args.number,
+            )))
+    finally:
+        app.auth.keyring = original_keyring
+    return results
+
+
+def run_password(args) -> List[dict]:
+    from passlib.exc import MissingBackendError
+    from app.hashing import build_crypt_context
+
+    results = []
+    for scheme in args.schemes:
+        for rounds in args.rounds.get(scheme, [None]):
+            context = build_crypt_context(scheme, rounds)
+            try:
+                hashed = context.hash("benchmark-password")
+            except MissingBackendError:
+                print(f"❌ Для {scheme} не установлен backend, схема пропущена")
+                break
+            params = {"scheme": scheme, "rounds": rounds}
+            results.append(result("password", "get_password_hash", params, bench(
+                lambda: context.hash("benchmark-password"),
+                args.password_warmup, args.password_repeat, 1,
+            )))
+            results.append(result("password", "verify_password", params, bench(
+                lambda: context.verify("benchmark-password", hashed),
+                args.password_warmup, args.password_repeat, 1,
+            )))
+    return results
+
+
+async def seed_refresh_tokens(db, user_id: int, rows: int) -> None:
+    """Заполнение таблицы refresh_tokens до rows строк"""
+    import secrets
+    from sqlalchemy import delete, insert
+    from app.auth import hash_refresh_token
+    from app.models import RefreshToken
+
+    await db.execute(delete(RefreshToken))
+    now = datetime.utcnow()
+    for offset in range(0, rows, 10000):
+        await db.execute(insert(RefreshToken), [
+            {
+                "user_id": user_id,
+                "token_hash": hash_refresh_token(secrets.token_urlsafe(32)),
+                "expires_at": now + timedelta(days=30),
+                "created_at": now,
+                "is_revoked": False,
+            }
+            for _ in range(min(10000, rows - offset))
+        ])
+    await db.commit()
+
+
+async def run_refresh_async(args) -> List[dict]:
+    from app.auth import create_refresh_token, verify_refresh_token
+    from app.database import AsyncSessionLocal, Base, async_engine
+    from app.models import User
+
+    check_temp_database()
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    results = []
+    async with AsyncSessionLocal() as db:
+        user = User(email="bench@example.com", username="bench", hashed_password="x", is_active=True)
+        db.add(user)
+        await db.commit()
+
+        for table_size in args.table_sizes:
+            await seed_refresh_tokens(db, user.id, table_size)
+            token = await create_refresh_token(user.id, db)
+            params = {"table_size": table_size, "dialect": async_engine.dialect.name}
+            results.append(result("refresh", "create_refresh_token", params, await bench_async(
+                lambda: create_refresh_token(user.id, db), args.warmup, args.repeat, args.number,
+            )))
+            results.append(result("refresh", "verify_refresh_token", params, await bench_async(
+                lambda: verify_refresh_token(token, db), args.warmup, args.repeat, args.number,
+            )))
+    await async_engine.dispose()
+    return results
+
+
+def run_refresh(args) -> List[dict]:
+    return asyncio.run(run_refresh_async(args))
+
+
+SUITES: Dict[str, Callable] = {"jwt": run_jwt, "password": run_password, "refresh": run_refresh}
+
+
+def result(suite: str, operation: str, params: dict, stats: dict) -> dict:
+    row = {"suite": suite, "operation": operation, "params": params, **stats}
+    label = ", ".join(f"{key}={value}" for key, value in params.items())
+    print(
+        f"{operation:<22} {label:<40} median {stats['median_us']:>12.1f} us  "
+        f"p95 {stats['p95_us']:>12.1f} us  {stats['ops_per_second']:>10.1f} ops/s"
+    )
+    return row
+
+
+def dependency_versions() -> Dict[str, str]:
+    versions = {}
+    for name in DEPENDENCIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def parse_rounds(values: List[str]) -> Dict[str, List[int]]:
+    """Стоимость по схемам: bcrypt=4,10,12 pbkdf2_sha256=29000"""
+    rounds = {}
+    for value in values:
+        scheme, _, costs = value.partition("=")
+        rounds[scheme] = [int(cost) for cost in costs.split(",") if cost]
+    return rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки примитивов app.auth")
+    parser.add_argument("--suite", nargs="+", choices=list(SUITES), default=list(SUITES),
+                        help="наборы бенчмарков")
+    parser.add_argument("--warmup", type=int, default=20, help="вызовов для прогрева")
+    parser.add_argument("--repeat", type=int, default=20, help="число замеров")
+    parser.add_argument("--number", type=int, default=50, help="вызовов в одном замере")
+    parser.add_argument("--algorithms", nargs="+", default=["HS256", "RS256", "ES256"],
+                        help="алгоритмы подписи JWT")
+    parser.add_argument("--rsa-sizes", nargs="+", type=int, default=[2048, 3072, 4096],
+                        help="размеры ключей RSA")
+    parser.add_argument("--schemes", nargs="+", default=["bcrypt", "pbkdf2_sha256"],
+                        help="схемы хеширования паролей")
+    parser.add_argument("--rounds", nargs="+", default=["bcrypt=4,8,10,12", "pbkdf2_sha256=29000,100000"],
+                        help="стоимость по схемам: SCHEME=COST,COST")
+    parser.add_argument("--password-warmup", type=int, default=1, help="прогрев для хеширования паролей")
+    parser.add_argument("--password-repeat", type=int, default=5, help="замеров для хеширования паролей")
+    parser.add_argument("--table-sizes", nargs="+", type=int, default=[1000, 10000, 100000],
+                        help="число строк refresh_tokens")
+    parser.add_argument("--json", dest="output", help="файл для сохранения результатов")
+    args = parser.parse_args()
+    args.rounds = parse_rounds(args.rounds)
+
+    results = []
+    for suite in args.suite:
+        print(f"🔍 {suite}")
+        results.extend(SUITES[suite](args))
+
+    if args.output:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "dependencies": dependency_versions(),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        print(f"✅ Результаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Временная база данных для бенчмарков
+
+Бенчмарки засеивают, очищают и перезаписывают таблицы, поэтому всегда работают
+на отдельном файле SQLite: DATABASE_URL из окружения намеренно переопределяется.
+use_temp_database нужно вызвать до импорта модулей app (настройки читаются при импорте).
+"""
+
+import os
+import tempfile
+
+# URL временной базы текущего процесса (None - use_temp_database еще не вызывалась)
+TEMP_DATABASE_URL = None
+
+
+def use_temp_database(prefix: str, filename: str = "bench.db") -> str:
+    """Создание временного каталога и переключение приложения на базу в нем, возвращает каталог"""
+    global TEMP_DATABASE_URL
+    db_dir = tempfile.mkdtemp(prefix=prefix)
+    TEMP_DATABASE_URL = f"sqlite:///{os.path.join(db_dir, filename)}"
+    os.environ["DATABASE_URL"] = TEMP_DATABASE_URL
+    # Схема временной базы создается create_all, а не миграциями
+    os.environ["SCHEMA_CHECK"] = "skip"
+    return db_dir
+
+
+def check_temp_database() -> None:
+    """Отказ от работы, если приложение настроено не на временную базу"""
+    from app.config import settings
+
+    if TEMP_DATABASE_URL is None or settings.database_url != TEMP_DATABASE_URL:
+        raise SystemExit(f"❌ Бенчмарк запускается только на временной базе, а не на {settings.database_url}")
+
+
+def temp_engine():
+    """Синхронный движок временной базы (после проверки, что она временная)"""
+    from sqlalchemy import create_engine
+    from app.config import settings
+    from app.database import get_sync_database_url
+
+    check_temp_database()
+    return create_engine(get_sync_database_url(settings.database_url))
+
+
+def create_schema() -> None:
+    """Создание схемы во временной базе"""
+    from app.database import Base
+
+    engine = temp_engine()
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
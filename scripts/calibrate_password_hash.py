@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Скрипт подбора стоимости хеширования паролей под целевое время проверки на этом хосте
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passlib.exc import MissingBackendError
+from app.hashing import SUPPORTED_SCHEMES, measure_verify_time
+
+# Кандидаты стоимости по возрастанию для каждой схемы
+CANDIDATE_ROUNDS = {
+    "bcrypt": list(range(8, 16)),
+    "argon2": list(range(1, 11)),
+    "pbkdf2_sha256": [100000, 200000, 300000, 400000, 600000, 800000, 1000000],
+}
+
+
+def calibrate(scheme: str, target: float, samples: int):
+    """Максимальная стоимость схемы, при которой проверка укладывается в target секунд"""
+    chosen = None
+    for rounds in CANDIDATE_ROUNDS[scheme]:
+        elapsed = measure_verify_time(scheme, rounds, samples=samples)
+        print(f"   {scheme} rounds={rounds}: {elapsed * 1000:.1f} мс")
+        if elapsed > target:
+            break
+        chosen = (rounds, elapsed)
+    return chosen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Подбор стоимости хеширования паролей")
+    parser.add_argument("--target-ms", type=float, default=250,
+                        help="целевое время проверки одного пароля в миллисекундах")
+    parser.add_argument("--schemes", nargs="+", default=list(SUPPORTED_SCHEMES),
+                        choices=SUPPORTED_SCHEMES, help="проверяемые схемы")
+    parser.add_argument("--samples", type=int, default=3,
+                        help="число замеров для каждой стоимости")
+    args = parser.parse_args()
+
+    results = {}
+    for scheme in args.schemes:
+        print(f"🔍 Замер {scheme}...")
+        try:
+            chosen = calibrate(scheme, args.target_ms / 1000, args.samples)
+        except MissingBackendError:
+            print(f"❌ Для {scheme} не установлен backend, схема пропущена")
+            continue
+        if chosen is None:
+            print(f"❌ {scheme}: даже минимальная стоимость превышает {args.target_ms} мс")
+            continue
+        results[scheme] = chosen
+
+    if not results:
+        print("❌ Не удалось подобрать ни одной схемы")
+        sys.exit(1)
+
+    # Предпочитаем схему в порядке SUPPORTED_SCHEMES из указанных
+    scheme = next(scheme for scheme in args.schemes if scheme in results)
+    rounds, elapsed = results[scheme]
+    print(f"✅ Рекомендуемые настройки ({elapsed * 1000:.1f} мс на проверку):")
+    print(f"PASSWORD_HASH_SCHEME={scheme}")
+    print(f"PASSWORD_HASH_ROUNDS={rounds}")
@@ -3,22 +3,23 @@
 Скрипт для создания суперпользователя
 """
 
+import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal, async_engine
+from app.hashing import password_hasher
 from app.crud import create_user, get_user_by_email, get_user_by_username
 from app.schemas import UserCreate
 
 
-def create_superuser():
+async def create_superuser():
     """Создание суперпользователя"""
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
         # Проверяем, существует ли уже суперпользователь
-        existing_user = get_user_by_email(db, "admin@example.com")
+        existing_user = await get_user_by_email(db, "admin@example.com")
         if existing_user:
             print("Суперпользователь уже существует!")
             return
@@ -30,11 +31,11 @@ def create_superuser():
             password="admin123"
         )
         
-        user = create_user(db=db, user=superuser_data)
+        user = await create_user(db=db, user=superuser_data)
         
         # Делаем пользователя суперпользователем
         user.is_superuser = True
-        db.commit()
+        await db.commit()
         
         print("✅ Суперпользователь успешно создан!")
         print(f"Email: {user.email}")
@@ -45,8 +46,10 @@ def create_superuser():
     except Exception as e:
         print(f"❌ Ошибка при создании суперпользователя: {e}")
     finally:
-        db.close()
+        await db.close()
+        await async_engine.dispose()
+        password_hasher.shutdown()
 
 
 if __name__ == "__main__":
-    create_superuser()
+    asyncio.run(create_superuser())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Скрипт для ротации ключей подписи JWT (RS*/ES*)
+
+Новый ключ становится активным после перезапуска воркеров (или явного JWT_ACTIVE_KID).
+Выведенный из ротации ключ оставьте в виде <kid>.pub.pem, пока не истекут
+подписанные им access токены, затем удалите файл.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.keys import PRIVATE_KEY_SUFFIX, generate_private_key_pem, retire_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ротация ключей подписи JWT")
+    parser.add_argument("--dir", default=settings.jwt_keys_dir, help="каталог ключей")
+    parser.add_argument("--algorithm", default=settings.algorithm, help="алгоритм подписи")
+    parser.add_argument("--kid", default=None, help="идентификатор нового ключа")
+    parser.add_argument("--key-size", type=int, default=2048, help="размер ключа RSA в битах")
+    parser.add_argument("--retire", metavar="KID", default=None,
+                        help="оставить от ключа KID только открытую часть")
+    args = parser.parse_args()
+
+    if not args.dir:
+        print("❌ Укажите каталог ключей (--dir или JWT_KEYS_DIR)")
+        sys.exit(1)
+    os.makedirs(args.dir, exist_ok=True)
+
+    try:
+        if args.retire:
+            retire_key(args.dir, args.retire, args.algorithm)
+            print(f"✅ Ключ {args.retire} выведен из ротации")
+            return
+
+        kid = args.kid or datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        path = os.path.join(args.dir, kid + PRIVATE_KEY_SUFFIX)
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as key_file:
+            key_file.write(generate_private_key_pem(args.algorithm, args.key_size))
+        print(f"✅ Создан ключ {kid} ({args.algorithm}): {path}")
+    except Exception as e:
+        print(f"❌ Ошибка при работе с ключами: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Скрипт для массового импорта пользователей из CSV или NDJSON
+
+Поля записи: email, username, password или hashed_password (bcrypt),
+необязательные is_active и is_superuser.
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.bulk_import import IMPORT_FORMATS, detect_format, import_users
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.hashing import password_hasher
+
+
+async def run_import(path: str, fmt: str, batch_size: int):
+    """Импорт пользователей из файла"""
+    try:
+        with open(path, encoding="utf-8", newline="") as stream:
+            async with AsyncSessionLocal() as db:
+                report = await import_users(db, stream, fmt, batch_size=batch_size)
+        
+        for error in report.errors:
+            print(f"  строка {error.line}: {error.error}")
+        print(f"✅ Обработано записей: {report.total}")
+        print(f"Создано: {report.created}, ошибок: {report.failed}")
+        print(f"Время: {report.elapsed_seconds} с ({report.rows_per_second} записей/с)")
+    except Exception as e:
+        print(f"❌ Ошибка при импорте пользователей: {e}")
+    finally:
+        await async_engine.dispose()
+        password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Массовый импорт пользователей")
+    parser.add_argument("path", help="путь к CSV или NDJSON файлу")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None,
+                        help="формат файла (по умолчанию - по расширению)")
+    parser.add_argument("--batch-size", type=int, default=settings.user_import_batch_size,
+                        help="число пользователей в одной вставке")
+    args = parser.parse_args()
+    asyncio.run(run_import(args.path, args.format or detect_format(args.path), args.batch_size))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Скрипт для удаления истекших и отозванных refresh токенов
+"""
+
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.maintenance import purge_refresh_tokens
+
+
+async def purge(batch_size: int, max_batches: int, pause: float):
+    """Очистка таблицы refresh_tokens"""
+    try:
+        async with AsyncSessionLocal() as db:
+            deleted = await purge_refresh_tokens(
+                db, batch_size=batch_size, max_batches=max_batches, pause=pause
+            )
+        print(f"✅ Удалено токенов: {deleted}")
+    except Exception as e:
+        print(f"❌ Ошибка при очистке токенов: {e}")
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Удаление истекших и отозванных refresh токенов")
+    parser.add_argument("--batch-size", type=int, default=settings.token_purge_batch_size,
+                        help="число строк в одной транзакции")
+    parser.add_argument("--max-batches", type=int, default=None,
+                        help="максимальное число пачек за запуск")
+    parser.add_argument("--pause-ms", type=int, default=settings.token_purge_batch_pause_ms,
+                        help="пауза между пачками в миллисекундах")
+    args = parser.parse_args()
+    asyncio.run(purge(args.batch_size, args.max_batches, args.pause_ms / 1000))
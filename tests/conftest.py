@@ -1,32 +1,59 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
+from app.config import settings
 from app.database import get_db, Base
 from app.models import User
 from app.auth import get_password_hash
+from app.cache import principal_cache, token_cache, user_version_cache
+from app.metrics import instrument_engine
+from app.ratelimit import login_rate_limiter
+from app.revocation import revocation_index
+from app.sessions import session_activity
 
 # Создаем тестовую базу данных в памяти
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Создаем таблицы для тестов
-Base.metadata.create_all(bind=engine)
+# Асинхронный движок для приложения: NullPool, т.к. каждый TestClient создает свой цикл событий
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+instrument_engine(async_engine.sync_engine)
 
 
-def override_get_db():
+@pytest.fixture(autouse=True)
+def reset_database():
+    """Пересоздаем таблицы для каждого теста"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    principal_cache.clear()
+    token_cache.clear()
+    user_version_cache.clear()
+    revocation_index.clear()
+    session_activity.clear()
+    asyncio.run(login_rate_limiter.backend.clear())
+    yield
+
+
+async def override_get_db():
     """Переопределяем зависимость для получения тестовой сессии БД"""
-    try:
-        db = TestingSessionLocal()
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # Подменяем зависимость
 app.dependency_overrides[get_db] = override_get_db
+# Фоновые задачи жизненного цикла (индекс отзыва, планировщик, отложенная запись) - в тестовую БД
+app.state.session_factory = TestingAsyncSessionLocal
+session_activity.session_factory = TestingAsyncSessionLocal
+# Тестовая схема создается через create_all, а не миграциями
+settings.schema_check = "skip"
 
 
 @pytest.fixture
@@ -36,6 +63,18 @@ def client():
         yield c
 
 
+@pytest.fixture
+def auth_headers(client):
+    """Фикстура для получения заголовка авторизации пользователя"""
+    def _auth_headers(username: str, password: str) -> dict:
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"username": username, "password": password}
+        )
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return _auth_headers
+
+
 @pytest.fixture
 def db_session():
     """Фикстура для тестовой сессии БД"""
@@ -46,6 +85,23 @@ def db_session():
         db.close()
 
 
+@pytest.fixture
+def async_session_factory():
+    """Фикстура фабрики асинхронных сессий тестовой БД"""
+    return TestingAsyncSessionLocal
+
+
+@pytest.fixture
+def run_with_db():
+    """Фикстура для выполнения корутины с асинхронной сессией тестовой БД"""
+    def _run(func, *args, **kwargs):
+        async def _call():
+            async with TestingAsyncSessionLocal() as db:
+                return await func(db, *args, **kwargs)
+        return asyncio.run(_call())
+    return _run
+
+
 @pytest.fixture
 def test_user(db_session):
     """Фикстура для тестового пользователя"""
@@ -1,5 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
+from app.auth import hash_refresh_token
+from app.models import RefreshToken, User
+from passlib.hash import pbkdf2_sha256
 
 
 def test_register_user(client: TestClient):
@@ -155,3 +158,42 @@ def test_me_endpoint_no_token(client: TestClient):
     """Тест получения информации без токена"""
     response = client.get("/api/v1/auth/me")
     assert response.status_code == 403
+
+
+def test_refresh_token_stored_as_digest(client: TestClient, test_user, db_session):
+    """Тест хранения refresh токена в виде SHA-256 digest"""
+    login_response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "username": "testuser",
+            "password": "testpassword"
+        }
+    )
+    refresh_token = login_response.json()["refresh_token"]
+    
+    db_token = db_session.query(RefreshToken).one()
+    assert db_token.token_hash == hash_refresh_token(refresh_token)
+    assert len(db_token.token_hash) == 64
+    assert db_token.token_hash != refresh_token
+
+
+def test_login_rehashes_outdated_password(client: TestClient, db_session):
+    """Тест: хеш устаревшей схемы заменяется при успешном входе"""
+    user = User(
+        email="legacy@example.com",
+        username="legacy",
+        hashed_password=pbkdf2_sha256.hash("legacypassword"),
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.post("/api/v1/auth/login", json={"username": "legacy", "password": "legacypassword"})
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    user = db_session.query(User).filter(User.username == "legacy").first()
+    assert user.hashed_password.startswith("$2b$")
+
+    response = client.post("/api/v1/auth/login", json={"username": "legacy", "password": "legacypassword"})
+    assert response.status_code == 200
@@ -0,0 +1,66 @@
+import io
+import json
+import threading
+from fastapi.testclient import TestClient
+from app.bulk_import import UserImporter, import_users
+from app.hashing import get_password_hash
+from app.models import User
+
+
+def test_import_users_ndjson(db_session, run_with_db, test_user):
+    """Тест импорта NDJSON с конфликтами и заранее вычисленными хешами"""
+    lines = [
+        {"email": "a@example.com", "username": "alice", "password": "alicepassword"},
+        {"email": "b@example.com", "username": "bob", "hashed_password": get_password_hash("bobpassword")},
+        {"email": "test@example.com", "username": "other"},
+        {"email": "test@example.com", "username": "other", "password": "x"},
+        {"email": "c@example.com", "username": "alice", "password": "x"},
+        {"email": "d@example.com", "username": "dave", "hashed_password": "plain"},
+    ]
+    stream = io.StringIO("\n".join(json.dumps(line) for line in lines) + "\n{broken\n")
+    report = run_with_db(import_users, stream, "ndjson", batch_size=2)
+    
+    assert report.total == 7
+    assert report.created == 2
+    errors = [(error.line, error.error) for error in report.errors]
+    assert [line for line, _ in errors] == [3, 4, 5, 6, 7]
+    assert errors[1:4] == [
+        (4, "Email already registered"),
+        (5, "Duplicate username in import"),
+        (6, "Unsupported password hash"),
+    ]
+    assert {user.username for user in db_session.query(User).all()} == {"testuser", "alice", "bob"}
+
+
+def test_import_users_endpoint_csv(client: TestClient, auth_headers, test_superuser):
+    """Тест импорта CSV через API"""
+    headers = auth_headers("admin", "adminpassword")
+    content = "email,username,password,is_active\nx@example.com,xuser,xpassword,false\n"
+    response = client.post(
+        "/api/v1/users/import",
+        files={"file": ("users.csv", content, "text/csv")},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    
+    response = client.post("/api/v1/auth/login", json={"username": "xuser", "password": "xpassword"})
+    assert response.status_code == 400
+
+
+def test_import_parses_outside_event_loop(db_session, run_with_db):
+    """Тест: чтение и разбор файла выполняются не в потоке цикла событий"""
+    loop_thread = threading.get_ident()
+    parse_threads = set()
+
+    def records():
+        for index in range(5):
+            parse_threads.add(threading.get_ident())
+            yield index + 1, {"email": f"u{index}@example.com", "username": f"u{index}", "password": "password"}
+
+    async def run(db):
+        return await UserImporter(db, batch_size=2).run(records())
+
+    report = run_with_db(run)
+    assert report.created == 5
+    assert parse_threads and loop_thread not in parse_threads
@@ -0,0 +1,73 @@
+import time
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from app.auth import create_access_token, decode_access_token
+from app.cache import TTLCache, principal_cache, token_cache
+
+
+def test_ttl_cache_lru_eviction():
+    """Тест вытеснения самой старой записи"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_expiration():
+    """Тест истечения времени жизни записи"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_disabled():
+    """Тест отключенного кеша"""
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_principal_cache_hit(client: TestClient, auth_headers, test_user):
+    """Тест повторного запроса /me из кеша"""
+    headers = auth_headers("testuser", "testpassword")
+    client.get("/api/v1/auth/me", headers=headers)
+    hits = principal_cache.hits
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert principal_cache.hits == hits + 1
+
+
+def test_principal_cache_invalidation(client: TestClient, auth_headers, test_user, test_superuser):
+    """Тест инвалидации кеша при деактивации пользователя"""
+    headers = auth_headers("testuser", "testpassword")
+    admin_headers = auth_headers("admin", "adminpassword")
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    
+    client.post(f"/api/v1/users/{test_user.id}/deactivate", headers=admin_headers)
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_token_cache_skips_decode(client: TestClient, auth_headers, test_user):
+    """Тест повторного использования проверенного access токена"""
+    headers = auth_headers("testuser", "testpassword")
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    hits = token_cache.hits
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert token_cache.hits == hits + 1
+
+
+def test_token_cache_entry_expires_at_exp():
+    """Тест истечения записи кеша вместе с токеном"""
+    token = create_access_token({"sub": "testuser"}, expires_delta=timedelta(seconds=1))
+    decode_access_token(token)
+    assert token_cache.get(token) is not None
+    time.sleep(1.1)
+    assert token_cache.get(token) is None
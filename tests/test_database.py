@@ -0,0 +1,168 @@
+import asyncio
+import pytest
+from passlib.hash import pbkdf2_sha256
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config import settings
+from app.auth import authenticate_user, load_principals
+from app.cache import principal_cache
+from app.crud import get_user_by_username, update_user
+from app.database import (
+    Base, InstrumentedAsyncQueuePool, create_async_sessionmaker, get_async_database_url,
+    get_pool_options, get_pool_status, get_sync_database_url, set_sqlite_pragmas
+)
+from app.models import User
+from app.schemas import UserUpdate
+
+
+def test_async_database_url():
+    """Тест выбора асинхронного драйвера по URL"""
+    assert get_async_database_url("sqlite:///./auth.db") == "sqlite+aiosqlite:///./auth.db"
+    assert get_async_database_url("postgresql://u:p@db:5432/auth") == "postgresql+asyncpg://u:p@db:5432/auth"
+    assert get_async_database_url("sqlite+aiosqlite:///./auth.db") == "sqlite+aiosqlite:///./auth.db"
+    with pytest.raises(ValueError):
+        get_async_database_url("mysql://u:p@db/auth")
+
+
+def test_sync_database_url():
+    """Тест выбора синхронного драйвера для миграций"""
+    assert get_sync_database_url("sqlite+aiosqlite:///./auth.db") == "sqlite:///./auth.db"
+    assert get_sync_database_url("postgresql+asyncpg://u:p@db/auth") == "postgresql://u:p@db/auth"
+    assert get_sync_database_url("sqlite:///./auth.db") == "sqlite:///./auth.db"
+
+
+def test_pool_options():
+    """Тест параметров пула из настроек"""
+    options = get_pool_options("postgresql+asyncpg://u:p@db/auth")
+    assert options["pool_size"] == settings.db_pool_size
+    assert options["pool_pre_ping"] == settings.db_pool_pre_ping
+    assert get_pool_options("sqlite://") == {}
+
+
+def test_sqlite_pragmas(tmp_path):
+    """Тест профиля SQLite (WAL, synchronous, busy_timeout) на асинхронном движке"""
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pragmas.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        **get_pool_options(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    )
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
+    async def run():
+        async with async_engine.connect() as connection:
+            journal_mode = (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+            busy_timeout = (await connection.execute(text("PRAGMA busy_timeout"))).scalar()
+            status = get_pool_status(async_engine)
+        await async_engine.dispose()
+        return journal_mode, busy_timeout, status
+
+    journal_mode, busy_timeout, status = asyncio.run(run())
+    assert journal_mode == settings.sqlite_journal_mode.lower()
+    assert busy_timeout == settings.sqlite_busy_timeout_ms
+    assert status["checked_out"] == 1
+    assert status["checkouts"] == 1
+
+
+def test_readiness_endpoint(client):
+    """Тест /health/ready"""
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert "class" in data["pool"]
+
+
+def test_replica_routing(tmp_path):
+    """Тест маршрутизации: чтение из реплики, после записи - только основная БД"""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    session_factory = create_async_sessionmaker(primary, [replica])
+
+    async def run():
+        for engine, username in ((primary, "primary"), (replica, "replica")):
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.execute(User.__table__.insert().values(
+                    email=f"{username}@example.com", username=username, hashed_password="x"
+                ))
+
+        async with session_factory() as db:
+            # Чтение без записи - из реплики
+            assert await get_user_by_username(db, "replica") is not None
+            assert await get_user_by_username(db, "primary") is None
+            # Явное требование основной БД
+            result = await db.execute(select(User.username).execution_options(use_primary=True))
+            assert result.scalars().all() == ["primary"]
+
+        async with session_factory() as db:
+            db.add(User(email="new@example.com", username="new", hashed_password="x"))
+            await db.commit()
+            # Реплика еще не получила запись: чтение после записи остается на основной БД
+            assert await get_user_by_username(db, "new") is not None
+            assert await get_user_by_username(db, "replica") is None
+
+        await primary.dispose()
+        await replica.dispose()
+
+    asyncio.run(run())
+
+
+def test_replica_routing_for_cache_and_writes(tmp_path):
+    """Тест: снимки для кеша и пользователь для изменения читаются с основной БД"""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    session_factory = create_async_sessionmaker(primary, [replica])
+
+    async def run():
+        # Реплика отстает: у пользователя 1 там еще старое имя
+        for engine, username in ((primary, "current"), (replica, "stale")):
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.execute(User.__table__.insert().values(
+                    email="user@example.com", username=username, hashed_password="x"
+                ))
+
+        async with session_factory() as db:
+            principals = await load_principals(db, ["current", "stale"])
+            assert list(principals) == ["current"]
+            assert principal_cache.get("stale") is None
+
+        async with session_factory() as db:
+            db_user = await update_user(db, 1, UserUpdate(username="renamed"))
+            assert db_user.username == "renamed"
+            # Сброшен снимок по имени из основной БД, а не из реплики
+            assert principal_cache.get("current") is None
+
+        await primary.dispose()
+        await replica.dispose()
+
+    asyncio.run(run())
+
+
+def test_rehash_does_not_overwrite_primary(tmp_path):
+    """Тест: пересчет устаревшего хеша не затирает пароль, смененный на основной БД"""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    session_factory = create_async_sessionmaker(primary, [replica])
+    new_hash = pbkdf2_sha256.hash("newpassword")
+
+    async def run():
+        # Реплика еще не получила смену пароля
+        for engine, hashed_password in ((primary, new_hash), (replica, pbkdf2_sha256.hash("oldpassword"))):
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.execute(User.__table__.insert().values(
+                    email="legacy@example.com", username="legacy", hashed_password=hashed_password
+                ))
+
+        async with session_factory() as db:
+            await authenticate_user(db, "legacy", "oldpassword")
+
+        async with primary.connect() as connection:
+            stored = (await connection.execute(select(User.hashed_password))).scalar_one()
+        assert stored == new_hash
+
+        await primary.dispose()
+        await replica.dispose()
+
+    asyncio.run(run())
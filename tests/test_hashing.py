@@ -0,0 +1,36 @@
+import asyncio
+from app.hashing import PasswordHasher, build_crypt_context, measure_verify_time, verify_password
+
+
+def test_hasher_process_pool():
+    """Тест хеширования и проверки пароля в пуле процессов"""
+    hasher = PasswordHasher(workers=1)
+    try:
+        hashed = asyncio.run(hasher.hash("secret"))
+        assert verify_password("secret", hashed)
+        assert asyncio.run(hasher.verify("secret", hashed)) is True
+        assert asyncio.run(hasher.verify("wrong", hashed)) is False
+    finally:
+        hasher.shutdown()
+
+
+def test_hasher_without_pool():
+    """Тест хеширования без пула процессов"""
+    hasher = PasswordHasher(workers=0)
+    hashed = asyncio.run(hasher.hash("secret"))
+    assert asyncio.run(hasher.verify("secret", hashed)) is True
+
+
+def test_crypt_context_flags_outdated_cost():
+    """Тест: хеш с другой стоимостью пересчитывается при проверке"""
+    old_hash = build_crypt_context("bcrypt", 4).hash("secret")
+    context = build_crypt_context("bcrypt", 5)
+    assert context.needs_update(old_hash)
+    valid, new_hash = context.verify_and_update("secret", old_hash)
+    assert valid is True
+    assert new_hash.startswith("$2b$05$")
+
+
+def test_measure_verify_time():
+    """Тест замера времени проверки пароля"""
+    assert measure_verify_time("bcrypt", 4, samples=2) > 0
@@ -0,0 +1,53 @@
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from app.auth import create_access_token
+
+
+def login(client: TestClient, username: str, password: str) -> str:
+    """Получение access токена"""
+    response = client.post("/api/v1/auth/login", json={"username": username, "password": password})
+    return response.json()["access_token"]
+
+
+def test_introspect_tokens(client: TestClient, test_user, test_superuser):
+    """Тест пакетной проверки токенов"""
+    admin_token = login(client, "admin", "adminpassword")
+    user_token = login(client, "testuser", "testpassword")
+    expired_token = create_access_token({"sub": "testuser"}, expires_delta=timedelta(seconds=-1))
+    unknown_token = create_access_token({"sub": "ghost"})
+    
+    response = client.post(
+        "/api/v1/auth/introspect",
+        json={"tokens": [user_token, admin_token, expired_token, unknown_token, "garbage"]},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["active"] for result in results] == [True, True, False, False, False]
+    assert results[0]["sub"] == "testuser"
+    assert results[0]["user"]["id"] == test_user.id
+    assert results[1]["user"]["is_superuser"] is True
+
+
+def test_introspect_inactive_user(client: TestClient, test_user, test_superuser):
+    """Тест проверки токена деактивированного пользователя"""
+    admin_token = login(client, "admin", "adminpassword")
+    user_token = login(client, "testuser", "testpassword")
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    client.post(f"/api/v1/users/{test_user.id}/deactivate", headers=headers)
+    
+    response = client.post("/api/v1/auth/introspect", json={"tokens": [user_token]}, headers=headers)
+    result = response.json()["results"][0]
+    assert result["active"] is False
+    assert result["user"]["is_active"] is False
+
+
+def test_introspect_requires_superuser(client: TestClient, test_user):
+    """Тест доступа к пакетной проверке только для суперпользователей"""
+    user_token = login(client, "testuser", "testpassword")
+    response = client.post(
+        "/api/v1/auth/introspect",
+        json={"tokens": [user_token]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 403
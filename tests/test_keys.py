@@ -0,0 +1,58 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from jose import JWTError, jwt
+from app.keys import KeyRing, generate_private_key_pem, retire_key
+
+
+def write_key(keys_dir, kid: str, algorithm: str):
+    """Создание закрытого ключа в каталоге"""
+    with open(os.path.join(keys_dir, f"{kid}.pem"), "w") as key_file:
+        key_file.write(generate_private_key_pem(algorithm))
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256"])
+def test_keyring_sign_and_decode(tmp_path, algorithm):
+    """Тест подписи активным ключом с заголовком kid"""
+    write_key(tmp_path, "k1", algorithm)
+    keyring = KeyRing(algorithm, "unused", keys_dir=str(tmp_path))
+    token = keyring.sign({"sub": "testuser"})
+    assert jwt.get_unverified_header(token)["kid"] == "k1"
+    assert keyring.decode(token)["sub"] == "testuser"
+    
+    jwks = keyring.jwks()
+    assert [key["kid"] for key in jwks["keys"]] == ["k1"]
+    assert "d" not in jwks["keys"][0]
+
+
+def test_keyring_rotation(tmp_path):
+    """Тест ротации: токены выведенного ключа принимаются до его удаления"""
+    write_key(tmp_path, "k1", "ES256")
+    old_keyring = KeyRing("ES256", "unused", keys_dir=str(tmp_path))
+    old_token = old_keyring.sign({"sub": "testuser"})
+    
+    write_key(tmp_path, "k2", "ES256")
+    retire_key(str(tmp_path), "k1", "ES256")
+    keyring = KeyRing("ES256", "unused", keys_dir=str(tmp_path))
+    assert jwt.get_unverified_header(keyring.sign({"sub": "x"}))["kid"] == "k2"
+    assert keyring.decode(old_token)["sub"] == "testuser"
+    assert {key["kid"] for key in keyring.jwks()["keys"]} == {"k1", "k2"}
+    
+    os.remove(os.path.join(tmp_path, "k1.pub.pem"))
+    keyring.reload()
+    with pytest.raises(JWTError):
+        keyring.decode(old_token)
+
+
+def test_keyring_requires_keys(tmp_path):
+    """Тест ошибки конфигурации без закрытых ключей"""
+    with pytest.raises(ValueError):
+        KeyRing("RS256", "unused", keys_dir=str(tmp_path))
+
+
+def test_jwks_endpoint(client: TestClient):
+    """Тест публикации JWKS"""
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}
+    assert "max-age" in response.headers["Cache-Control"]
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from app.maintenance import purge_refresh_tokens
+from app.models import RefreshToken
+
+
+def add_token(db_session, token_hash: str, expires_at: datetime, is_revoked: bool = False):
+    """Добавление refresh токена в тестовую БД"""
+    db_session.add(RefreshToken(
+        user_id=1, token_hash=token_hash, expires_at=expires_at, is_revoked=is_revoked
+    ))
+    db_session.commit()
+
+
+def test_purge_refresh_tokens(db_session, run_with_db):
+    """Тест удаления истекших и отозванных токенов"""
+    future = datetime.utcnow() + timedelta(days=1)
+    past = datetime.utcnow() - timedelta(days=1)
+    add_token(db_session, "a" * 64, future)
+    add_token(db_session, "b" * 64, past)
+    add_token(db_session, "c" * 64, future, is_revoked=True)
+    
+    assert run_with_db(purge_refresh_tokens, batch_size=1) == 2
+    assert [token.token_hash for token in db_session.query(RefreshToken).all()] == ["a" * 64]
+
+
+def test_purge_refresh_tokens_max_batches(db_session, run_with_db):
+    """Тест ограничения числа пачек за один запуск"""
+    past = datetime.utcnow() - timedelta(days=1)
+    for i in range(5):
+        add_token(db_session, str(i) * 64, past)
+    
+    assert run_with_db(purge_refresh_tokens, batch_size=2, max_batches=1) == 2
+    assert db_session.query(RefreshToken).count() == 3
@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.main import app
+from app.metrics import MetricsMiddleware, MetricsRegistry, db_queries_per_request, http_requests_total
+
+
+def test_registry_render():
+    """Тест текстового формата Prometheus"""
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ("route",))
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    counter.inc('/a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a\\"b"} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_metrics_endpoint(client: TestClient, auth_headers, test_user):
+    """Тест метрик маршрутов, bcrypt, JWT, SQL и кешей"""
+    headers = auth_headers("testuser", "testpassword")
+    before = http_requests_total.value("GET", "/api/v1/auth/me", "200")
+    queries_before = db_queries_per_request.count("/api/v1/auth/me")
+    client.get("/api/v1/auth/me", headers=headers)
+
+    assert http_requests_total.value("GET", "/api/v1/auth/me", "200") == before + 1
+    assert db_queries_per_request.count("/api/v1/auth/me") == queries_before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/auth/me"}' in text
+    assert 'password_hash_duration_seconds_count{operation="verify"}' in text
+    assert 'jwt_duration_seconds_count{operation="encode"}' in text
+    assert 'db_queries_per_request_bucket{route="/api/v1/auth/login"' in text
+    assert 'cache_hit_ratio{cache="principal"}' in text
+    assert "# TYPE cache_hits_total counter" in text
+    assert "# TYPE cache_misses_total counter" in text
+
+
+def test_route_template_with_equal_params(client: TestClient, auth_headers, test_superuser):
+    """Тест шаблона маршрута, когда значения параметров совпадают"""
+    headers = auth_headers("admin", "adminpassword")
+    route = "/api/v1/users/{user_id}/sessions/{session_id}"
+    before = http_requests_total.value("DELETE", route, "404")
+    response = client.delete("/api/v1/users/999/sessions/999", headers=headers)
+    assert response.status_code == 404
+
+    assert http_requests_total.value("DELETE", route, "404") == before + 1
+    client.get("/api/v1/users/", headers=headers)
+    text = client.get("/metrics").text
+    assert 'route="/api/v1/users/"' in text
+
+
+def test_metrics_middleware_is_plain_asgi():
+    """Тест: метрики собирает ASGI-класс, а не BaseHTTPMiddleware"""
+    assert [middleware.cls for middleware in app.user_middleware].count(MetricsMiddleware) == 1
+
+
+def test_failed_query_releases_timer(run_with_db):
+    """Тест: отметка времени упавшего SQL-запроса снимается со стека соединения"""
+    async def fail(db):
+        connection = await db.connection()
+        with pytest.raises(OperationalError):
+            await connection.execute(text("SELECT * FROM missing_table"))
+        return connection.sync_connection.info.get("query_start_time")
+
+    assert run_with_db(fail) == []
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import (
+    Boolean, Column, DateTime, Integer, MetaData, String, Table, Text, create_engine, inspect, text
+)
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config import settings
+from app.migrations import SchemaMismatchError, check_schema, get_head_revisions
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Схема до появления миграций (Base.metadata.create_all исходных моделей)
+baseline_metadata = MetaData()
+Table(
+    "users", baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("username", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("is_active", Boolean),
+    Column("is_superuser", Boolean),
+    Column("created_at", DateTime(timezone=True)),
+    Column("updated_at", DateTime(timezone=True)),
+)
+Table(
+    "refresh_tokens", baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False),
+    Column("token", Text, unique=True, nullable=False),
+    Column("expires_at", DateTime(timezone=True), nullable=False),
+    Column("is_revoked", Boolean),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+
+def run_check(tmp_path, mode: str, revision: str = None):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+        try:
+            if revision is not None:
+                async with engine.begin() as connection:
+                    await connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32))"))
+                    await connection.execute(
+                        text("INSERT INTO alembic_version VALUES (:revision)"), {"revision": revision}
+                    )
+            await check_schema(engine, mode)
+        finally:
+            await engine.dispose()
+    asyncio.run(run())
+
+
+def test_check_schema_at_head(tmp_path):
+    """Тест: схема на последней миграции"""
+    (head,) = get_head_revisions()
+    run_check(tmp_path, "error", head)
+
+
+def test_check_schema_outdated(tmp_path):
+    """Тест: старт прерывается, если миграции не применены"""
+    with pytest.raises(SchemaMismatchError):
+        run_check(tmp_path, "error", "0001")
+    # Та же устаревшая база: warn и skip не прерывают старт
+    run_check(tmp_path, "warn")
+    run_check(tmp_path, "skip")
+
+
+def test_upgrade_database_created_by_create_all(tmp_path, monkeypatch):
+    """Тест: база без alembic_version, созданная create_all, обновляется до head"""
+    database_url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_engine(database_url)
+    baseline_metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO refresh_tokens (user_id, token, expires_at, is_revoked) "
+            "VALUES (1, 'raw-token', '2099-01-01 00:00:00', 0)"
+        ))
+
+    monkeypatch.setattr(settings, "database_url", database_url)
+    # Без alembic.ini: его настройка логирования не должна менять логгеры тестов
+    config = Config()
+    config.set_main_option("script_location", os.path.join(ROOT_DIR, "alembic"))
+    command.upgrade(config, "head")
+
+    with engine.connect() as connection:
+        (head,) = get_head_revisions()
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == head
+        assert connection.execute(text("SELECT token_hash FROM refresh_tokens")).scalar() == (
+            hashlib.sha256(b"raw-token").hexdigest()
+        )
+    assert "token" not in {column["name"] for column in inspect(engine).get_columns("refresh_tokens")}
+    engine.dispose()
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from app.config import Settings
+from app.ratelimit import LoginRateLimiter, MemoryRateLimitBackend, RateLimitBackend, login_rate_limiter
+
+
+def test_memory_backend_sliding_window():
+    """Тест скользящего окна: лимит, время до освобождения и сброс"""
+    backend = MemoryRateLimitBackend(max_keys=10)
+
+    async def run():
+        assert await backend.hit("a", limit=2, window=60) is None
+        assert await backend.hit("a", limit=2, window=60) is None
+        retry_after = await backend.hit("a", limit=2, window=60)
+        assert 0 < retry_after <= 60
+        await backend.reset("a")
+        assert await backend.hit("a", limit=2, window=60) is None
+
+    asyncio.run(run())
+
+
+def test_zero_limit_and_settings_validation():
+    """Тест: нулевой лимит отклоняется backend, лимитером и настройками"""
+    backend = MemoryRateLimitBackend(max_keys=10)
+    with pytest.raises(ValueError):
+        asyncio.run(backend.hit("a", limit=0, window=60))
+    with pytest.raises(ValueError):
+        LoginRateLimiter(backend, per_username=0, per_ip=10, window=60)
+    with pytest.raises(ValidationError):
+        Settings(login_rate_limit_per_username=0)
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+def test_memory_backend_lru_eviction():
+    """Тест ограничения числа ключей"""
+    backend = MemoryRateLimitBackend(max_keys=2)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await backend.hit(key, limit=1, window=60)
+        # Ключ "a" вытеснен, поэтому попытка снова разрешена
+        assert await backend.hit("a", limit=1, window=60) is None
+        assert await backend.hit("c", limit=1, window=60) is not None
+
+    asyncio.run(run())
+
+
+def test_limiter_per_ip():
+    """Тест лимита по IP для разных username"""
+    limiter = LoginRateLimiter(MemoryRateLimitBackend(max_keys=100), per_username=10, per_ip=2, window=60)
+
+    async def run():
+        assert await limiter.check("alice", "10.0.0.1") is None
+        assert await limiter.check("bob", "10.0.0.1") is None
+        assert await limiter.check("carol", "10.0.0.1") is not None
+        assert await limiter.check("carol", "10.0.0.2") is None
+
+    asyncio.run(run())
+
+
+def test_login_throttled(client: TestClient, test_user, monkeypatch):
+    """Тест ответа 429 с Retry-After до проверки пароля"""
+    monkeypatch.setattr(login_rate_limiter, "per_username", 2)
+    for _ in range(2):
+        response = client.post("/api/v1/auth/login", json={"username": "testuser", "password": "wrong"})
+        assert response.status_code == 401
+
+    response = client.post("/api/v1/auth/login", json={"username": "testuser", "password": "testpassword"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    response = client.post("/api/v1/auth/login/form", data={"username": "testuser", "password": "testpassword"})
+    assert response.status_code == 429
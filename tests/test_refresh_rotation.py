@@ -0,0 +1,83 @@
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from app.auth import create_refresh_token, rotate_refresh_token, rotation_statement
+from app.config import settings
+from app.crud import deactivate_user
+from app.metrics import db_queries_per_request
+from app.models import RefreshToken
+
+
+def login(client: TestClient) -> dict:
+    response = client.post("/api/v1/auth/login", json={"username": "testuser", "password": "testpassword"})
+    return response.json()
+
+
+def test_refresh_single_query(client: TestClient, test_user):
+    """Тест: проверка refresh токена - один запрос к БД (токен вместе с пользователем)"""
+    refresh_token = login(client)["refresh_token"]
+    count = db_queries_per_request.count("/api/v1/auth/refresh")
+    queries = db_queries_per_request.sum("/api/v1/auth/refresh")
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] is None
+    assert db_queries_per_request.count("/api/v1/auth/refresh") == count + 1
+    assert db_queries_per_request.sum("/api/v1/auth/refresh") == queries + 1
+
+
+def test_refresh_rotation(client: TestClient, test_user, monkeypatch):
+    """Тест ротации: новый токен выдается, старый больше не принимается"""
+    monkeypatch.setattr(settings, "refresh_token_rotation", True)
+    refresh_token = login(client)["refresh_token"]
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    new_refresh_token = response.json()["refresh_token"]
+    assert new_refresh_token and new_refresh_token != refresh_token
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": new_refresh_token})
+    assert response.status_code == 200
+
+
+def test_rotation_inactive_user(client: TestClient, test_user, run_with_db, monkeypatch):
+    """Тест: ротация для неактивного пользователя ничего не записывает"""
+    monkeypatch.setattr(settings, "refresh_token_rotation", True)
+    refresh_token = login(client)["refresh_token"]
+    run_with_db(deactivate_user, test_user.id)
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+    async def user_tokens(db):
+        result = await db.execute(select(RefreshToken.is_revoked).where(RefreshToken.user_id == test_user.id))
+        return result.scalars().all()
+
+    # Новой сессии нет, исходный токен не отозван
+    assert run_with_db(user_tokens) == [False]
+
+
+def test_rotation_without_returning(test_user, run_with_db, monkeypatch):
+    """Тест запасного пути без UPDATE ... RETURNING"""
+    async def rotate_twice(db):
+        monkeypatch.setattr(db.get_bind().dialect, "update_returning", False)
+        token = await create_refresh_token(test_user.id, db)
+        first = await rotate_refresh_token(token, db)
+        second = await rotate_refresh_token(token, db)
+        return first, second
+
+    first, second = run_with_db(rotate_twice)
+    assert first is not None and first[0].username == "testuser"
+    assert second is None
+
+
+def test_rotation_statement_postgresql():
+    """Тест: на PostgreSQL отзыв и загрузка пользователя - один запрос"""
+    sql = str(rotation_statement("digest", datetime.utcnow()).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH rotated AS \n(UPDATE refresh_tokens SET is_revoked=")
+    assert "RETURNING refresh_tokens.user_id, refresh_tokens.created_at" in sql
+    assert "JOIN rotated ON users.id = rotated.user_id" in sql
@@ -0,0 +1,76 @@
+import hashlib
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.auth import hash_refresh_token
+from app.revocation import RevocationIndex, revocation_index
+
+
+def login(client: TestClient) -> dict:
+    """Вход тестового пользователя"""
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"username": "testuser", "password": "testpassword"}
+    )
+    return response.json()
+
+
+def test_revocation_index_recent_set():
+    """Тест точного множества недавно отозванных токенов"""
+    index = RevocationIndex(recent_size=1)
+    first = hashlib.sha256(b"first").hexdigest()
+    second = hashlib.sha256(b"second").hexdigest()
+    index.revoke(first)
+    index.revoke(second)
+    assert index.is_revoked(second)
+    # Вытесненный из точного множества токен проверяется по БД
+    assert not index.is_revoked(first)
+    
+    now = datetime.utcnow()
+    index.revoke_user(1, now)
+    assert index.is_session_revoked(1, now - timedelta(seconds=1))
+    assert not index.is_session_revoked(1, now + timedelta(seconds=1))
+    assert not index.is_session_revoked(2, now)
+
+
+def test_logout_updates_index(client: TestClient, test_user):
+    """Тест отказа в обновлении отозванного токена"""
+    refresh_token = login(client)["refresh_token"]
+    client.post("/api/v1/auth/logout", json={"refresh_token": refresh_token})
+    assert revocation_index.is_revoked(hash_refresh_token(refresh_token))
+    
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+def test_logout_all(client: TestClient, test_user):
+    """Тест выхода со всех устройств"""
+    first = login(client)
+    second = login(client)
+    response = client.post(
+        "/api/v1/auth/logout-all",
+        headers={"Authorization": f"Bearer {first['access_token']}"}
+    )
+    assert response.status_code == 200
+    
+    for tokens in (first, second):
+        response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+    
+    # Сброс индекса: решение принимается по users.tokens_revoked_before
+    revocation_index.clear()
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == 401
+    
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": login(client)["refresh_token"]})
+    assert response.status_code == 200
+
+
+def test_revocation_index_load_is_bounded(client: TestClient, test_user, run_with_db):
+    """Тест: при старте загружаются только последние recent_size отозванных токенов"""
+    tokens = [login(client)["refresh_token"] for _ in range(3)]
+    for token in tokens:
+        client.post("/api/v1/auth/logout", json={"refresh_token": token})
+    
+    index = RevocationIndex(recent_size=2)
+    run_with_db(index.load)
+    assert [index.is_revoked(hash_refresh_token(token)) for token in tokens] == [False, True, True]
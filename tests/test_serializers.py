@@ -0,0 +1,37 @@
+import json
+from datetime import datetime
+from app import schemas
+from app.models import User
+from app.serializers import token_response, user_list_adapter, user_response, users_response
+
+
+def make_user(user_id: int) -> User:
+    return User(
+        id=user_id,
+        email=f"user{user_id}@example.com",
+        username=f"user{user_id}",
+        hashed_password="x",
+        is_active=True,
+        is_superuser=False,
+        created_at=datetime(2024, 1, 2, 3, 4, 5),
+        updated_at=None,
+    )
+
+
+def test_users_response_matches_validated_output():
+    """Тест: сериализация без валидации дает тот же JSON, что и через схему"""
+    users = [make_user(1), make_user(2)]
+    expected = user_list_adapter.dump_json(
+        user_list_adapter.validate_python(users, from_attributes=True)
+    )
+    assert users_response(users).body == expected
+    assert json.loads(user_response(users[0]).body)["created_at"] == "2024-01-02T03:04:05"
+
+
+def test_token_response():
+    """Тест ответа с токенами"""
+    response = token_response(access_token="a", token_type="bearer", expires_in=60)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == schemas.Token(
+        access_token="a", token_type="bearer", expires_in=60
+    ).model_dump()
@@ -0,0 +1,95 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.auth import hash_refresh_token
+from app.models import RefreshToken
+from app.sessions import session_activity
+
+LOGIN = {"username": "testuser", "password": "testpassword"}
+
+
+def login(client: TestClient, user_agent: str) -> dict:
+    response = client.post("/api/v1/auth/login", json=LOGIN, headers={"User-Agent": user_agent})
+    tokens = response.json()
+    tokens["headers"] = {"Authorization": f"Bearer {tokens['access_token']}"}
+    return tokens
+
+
+def test_list_and_revoke_sessions(client: TestClient, test_user):
+    """Тест списка сессий с данными устройства и отзыва одной сессии"""
+    phone = login(client, "phone")
+    laptop = login(client, "laptop")
+
+    response = client.get("/api/v1/auth/sessions", headers=laptop["headers"])
+    assert response.status_code == 200
+    sessions = response.json()
+    assert [session["user_agent"] for session in sessions] == ["laptop", "phone"]
+    assert all(session["ip_address"] and session["last_used_at"] for session in sessions)
+
+    phone_session = sessions[1]["id"]
+    response = client.delete(f"/api/v1/auth/sessions/{phone_session}", headers=laptop["headers"])
+    assert response.status_code == 200
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": phone["refresh_token"]})
+    assert response.status_code == 401
+    response = client.delete(f"/api/v1/auth/sessions/{phone_session}", headers=laptop["headers"])
+    assert response.status_code == 404
+
+    response = client.get("/api/v1/auth/sessions", headers=laptop["headers"])
+    assert [session["user_agent"] for session in response.json()] == ["laptop"]
+
+
+def test_logout_all_changes_me_etag(client: TestClient, test_user):
+    """Тест: после выхода со всех устройств /me отдает новый ETag, а не закешированный снимок"""
+    tokens = login(client, "phone")
+    etag = client.get("/api/v1/auth/me", headers=tokens["headers"]).headers["ETag"]
+
+    response = client.post("/api/v1/auth/logout-all", headers=tokens["headers"])
+    assert response.status_code == 200
+    response = client.get("/api/v1/auth/me", headers={**tokens["headers"], "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["updated_at"] is not None
+
+
+def test_admin_revokes_all_sessions(client: TestClient, auth_headers, test_user, test_superuser):
+    """Тест отзыва всех сессий пользователя суперпользователем"""
+    tokens = login(client, "phone")
+    login(client, "laptop")
+    admin_headers = auth_headers("admin", "adminpassword")
+
+    response = client.get(f"/api/v1/users/{test_user.id}/sessions", headers=admin_headers)
+    assert len(response.json()) == 2
+
+    response = client.delete(f"/api/v1/users/{test_user.id}/sessions", headers=admin_headers)
+    assert response.status_code == 200
+    response = client.get(f"/api/v1/users/{test_user.id}/sessions", headers=admin_headers)
+    assert response.json() == []
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+    response = client.get(f"/api/v1/users/{test_user.id}/sessions", headers=tokens["headers"])
+    assert response.status_code == 403
+    response = client.get("/api/v1/users/9999/sessions", headers=admin_headers)
+    assert response.status_code == 404
+
+
+def test_refresh_activity_is_coalesced(client: TestClient, test_user, db_session):
+    """Тест: /refresh не пишет в БД, отметки пишутся пачкой при сбросе"""
+    tokens = login(client, "phone")
+    token_hash = hash_refresh_token(tokens["refresh_token"])
+    created = db_session.query(RefreshToken).filter_by(token_hash=token_hash).one().last_used_at
+
+    for _ in range(3):
+        client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    last_used = session_activity.last_used(token_hash)
+    assert last_used is not None
+    db_session.expire_all()
+    assert db_session.query(RefreshToken).filter_by(token_hash=token_hash).one().last_used_at == created
+
+    # Список сессий уже видит отметку из буфера
+    sessions = client.get("/api/v1/auth/sessions", headers=tokens["headers"]).json()
+    assert sessions[0]["last_used_at"] == last_used.isoformat()
+
+    assert asyncio.run(session_activity.flush()) == 1
+    db_session.expire_all()
+    assert db_session.query(RefreshToken).filter_by(token_hash=token_hash).one().last_used_at == last_used
+    assert session_activity.last_used(token_hash) is None
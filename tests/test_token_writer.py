@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import RefreshToken
+from app.token_writer import RefreshTokenWriter, refresh_token_writer
+
+
+def make_row(user_id: int, index: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "user_id": user_id,
+        "token_hash": f"{index:064x}",
+        "expires_at": now + timedelta(days=30),
+        "created_at": now,
+        "is_revoked": False,
+    }
+
+
+def test_writer_group_commit(test_user, db_session, async_session_factory):
+    """Тест записи пачки по размеру и сброса очереди при остановке"""
+    writer = RefreshTokenWriter(async_session_factory, max_batch=3, max_delay=60, enabled=True)
+
+    async def run():
+        writer.start()
+        for index in range(3):
+            writer.enqueue(make_row(test_user.id, index))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if not writer._pending:
+                break
+        written = db_session.query(RefreshToken).count()
+        writer.enqueue(make_row(test_user.id, 3))
+        await writer.stop()
+        return written
+
+    assert asyncio.run(run()) == 3
+    assert db_session.query(RefreshToken).count() == 4
+
+
+def test_write_behind_login_and_refresh(test_user, db_session, async_session_factory, monkeypatch):
+    """Тест: /refresh видит токен из очереди, остановка записывает оставшиеся"""
+    monkeypatch.setattr(refresh_token_writer, "session_factory", async_session_factory)
+    monkeypatch.setattr(refresh_token_writer, "enabled", True)
+    # Пачка по времени не наступит: запись только по требованию и при остановке
+    monkeypatch.setattr(refresh_token_writer, "max_delay", 60)
+
+    with TestClient(app) as client:
+        login = {"username": "testuser", "password": "testpassword"}
+        refresh_token = client.post("/api/v1/auth/login", json=login).json()["refresh_token"]
+        assert db_session.query(RefreshToken).count() == 0
+
+        response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+        assert response.status_code == 200
+        assert db_session.query(RefreshToken).count() == 1
+
+        client.post("/api/v1/auth/login", json=login)
+    assert db_session.query(RefreshToken).count() == 2
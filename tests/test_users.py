@@ -0,0 +1,180 @@
+import time
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from fastapi.testclient import TestClient
+import app.api.endpoints.users as users_endpoints
+import app.cache
+import app.crud
+from app.config import settings
+from app.crud import UserConflictError, conflict_field, create_user
+from app.models import User
+from app.schemas import UserCreate
+
+
+def test_read_users_superuser(client: TestClient, auth_headers, test_user, test_superuser):
+    """Тест получения списка пользователей суперпользователем"""
+    headers = auth_headers("admin", "adminpassword")
+    response = client.get("/api/v1/users/", headers=headers)
+    assert response.status_code == 200
+    assert {user["username"] for user in response.json()} == {"testuser", "admin"}
+
+
+def test_read_users_forbidden(client: TestClient, auth_headers, test_user):
+    """Тест получения списка пользователей обычным пользователем"""
+    headers = auth_headers("testuser", "testpassword")
+    response = client.get("/api/v1/users/", headers=headers)
+    assert response.status_code == 403
+
+
+def test_update_user_password(client: TestClient, auth_headers, test_user):
+    """Тест смены пароля пользователем"""
+    headers = auth_headers("testuser", "testpassword")
+    response = client.put(
+        f"/api/v1/users/{test_user.id}",
+        json={"password": "changedpassword"},
+        headers=headers
+    )
+    assert response.status_code == 200
+    
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"username": "testuser", "password": "changedpassword"}
+    )
+    assert response.status_code == 200
+
+
+def test_deactivate_user(client: TestClient, auth_headers, test_user, test_superuser):
+    """Тест деактивации пользователя"""
+    headers = auth_headers("admin", "adminpassword")
+    response = client.post(f"/api/v1/users/{test_user.id}/deactivate", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+
+
+def test_read_users_cursor_pagination(client: TestClient, auth_headers, test_user, test_superuser):
+    """Тест постраничного обхода пользователей по курсору"""
+    headers = auth_headers("admin", "adminpassword")
+    response = client.get("/api/v1/users/?limit=1", headers=headers)
+    first_page = response.json()
+    cursor = response.headers["X-Next-Cursor"]
+    
+    response = client.get(f"/api/v1/users/?limit=1&cursor={cursor}", headers=headers)
+    second_page = response.json()
+    assert [user["id"] for user in first_page + second_page] == sorted([test_user.id, test_superuser.id])
+    
+    response = client.get(
+        f"/api/v1/users/?limit=1&cursor={response.headers['X-Next-Cursor']}", headers=headers
+    )
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_read_users_invalid_cursor(client: TestClient, auth_headers, test_superuser):
+    """Тест некорректного курсора"""
+    headers = auth_headers("admin", "adminpassword")
+    response = client.get("/api/v1/users/?cursor=garbage", headers=headers)
+    assert response.status_code == 400
+
+
+def test_create_user_conflict_race(client: TestClient, test_user, run_with_db, monkeypatch):
+    """Тест: нарушение уникальности при вставке дает то же сообщение, что и предпроверка"""
+    async def no_conflict(db, email, username):
+        return None
+
+    # Параллельный запрос успел вставить пользователя между проверкой и INSERT
+    monkeypatch.setattr(app.crud, "find_user_conflict", no_conflict)
+    for data, field in [
+        ({"email": "test@example.com", "username": "other"}, "email"),
+        ({"email": "other@example.com", "username": "testuser"}, "username"),
+    ]:
+        with pytest.raises(UserConflictError) as exc_info:
+            run_with_db(create_user, UserCreate(password="password123", **data))
+        assert exc_info.value.field == field
+
+    response = client.post("/api/v1/auth/register", json={
+        "email": "test@example.com", "username": "other", "password": "password123"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+def test_conflict_field_by_constraint_name():
+    """Тест: поле конфликта определяется по имени ограничения, а не по значениям в DETAIL"""
+    class Diag:
+        constraint_name = "ix_users_email"
+
+    class PsycopgError(Exception):
+        diag = Diag()
+
+    class AsyncpgError(Exception):
+        constraint_name = "ix_users_username"
+
+    email_detail = (
+        'duplicate key value violates unique constraint "ix_users_email"\n'
+        "DETAIL:  Key (email)=(username@example.com) already exists."
+    )
+    adapted = Exception("duplicate key value")
+    adapted.__cause__ = AsyncpgError()
+    cases = [
+        (PsycopgError(email_detail), "email"),
+        (Exception(email_detail), "email"),
+        (adapted, "username"),
+        (Exception("UNIQUE constraint failed: users.username"), "username"),
+        (Exception("UNIQUE constraint failed: users.email"), "email"),
+    ]
+    for orig, field in cases:
+        assert conflict_field(IntegrityError("INSERT", {}, orig)) == field
+
+
+def test_read_user_conditional_get(client: TestClient, auth_headers, test_user, monkeypatch):
+    """Тест ETag: 304 из кешированной версии без запроса к БД, новая версия после изменения"""
+    headers = auth_headers("testuser", "testpassword")
+    response = client.get(f"/api/v1/users/{test_user.id}", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    me = client.get("/api/v1/auth/me", headers=headers)
+    assert me.headers["ETag"] == etag
+    response = client.get("/api/v1/auth/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    async def no_db(*args, **kwargs):
+        raise AssertionError("unexpected database read")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(users_endpoints, "get_user", no_db)
+        response = client.get(
+            f"/api/v1/users/{test_user.id}", headers={**headers, "If-None-Match": f'W/{etag}, "other"'}
+        )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    client.put(f"/api/v1/users/{test_user.id}", headers=headers, json={"username": "renamed"})
+    headers = auth_headers("renamed", "testpassword")
+    response = client.get(f"/api/v1/users/{test_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["username"] == "renamed"
+
+
+def test_read_user_version_expires(client: TestClient, auth_headers, test_user, run_with_db, monkeypatch):
+    """Тест: изменение из другого процесса видно после истечения кешированной версии"""
+    assert app.cache.user_version_cache.ttl == settings.user_version_cache_ttl_seconds
+    assert settings.user_version_cache_ttl_seconds < settings.principal_cache_ttl_seconds
+    headers = auth_headers("testuser", "testpassword")
+    etag = client.get(f"/api/v1/users/{test_user.id}", headers=headers).headers["ETag"]
+
+    async def change_elsewhere(db):
+        # Другой процесс: запись в БД без сброса кешей этого процесса
+        await db.execute(update(User).where(User.id == test_user.id).values(email="moved@example.com"))
+        await db.commit()
+
+    run_with_db(change_elsewhere)
+    later = time.monotonic() + settings.user_version_cache_ttl_seconds + 1
+    monkeypatch.setattr(app.cache, "time", SimpleNamespace(monotonic=lambda: later))
+    response = client.get(f"/api/v1/users/{test_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["email"] == "moved@example.com"